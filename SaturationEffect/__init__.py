@@ -1,2 +1,35 @@
-from .saturation import *
+import importlib
+import os
+import warnings
 
+# Backend selection, the compiled extension (saturation.pyx) is used when it is built for
+# the platform, else the pure NumPy implementation (saturation_numpy.py) with the same API.
+# Set the environment variable SATURATION_BACKEND to 'numpy' to force the NumPy backend.
+BACKEND = os.environ.get('SATURATION_BACKEND', 'cython').lower()
+if BACKEND not in ('cython', 'numpy'):
+    raise ValueError("\nSATURATION_BACKEND must be 'cython' or 'numpy' got %s " % BACKEND)
+
+# Methods added after the first releases, an outdated build of the extension is rejected
+_REQUIRED = ('saturation_levels', 'saturation_stats', 'auto_saturation')
+
+if BACKEND == 'cython':
+    try:
+        _saturation = importlib.import_module(".saturation", __name__)
+        _missing = [name for name in _REQUIRED if not hasattr(_saturation, name)]
+        if _missing:
+            raise ImportError("outdated build, missing %s" % ', '.join(_missing))
+        from .saturation import *
+        from .saturation import __version__
+    except ImportError as e:
+        warnings.warn("\nSaturationEffect compiled extension is not available (%s), using the "
+                      "NumPy backend (slower).\nRebuild the extension: "
+                      "python setup_saturation.py build_ext --inplace --force" % e,
+                      RuntimeWarning)
+        BACKEND = 'numpy'
+
+if BACKEND == 'numpy':
+    from .saturation_numpy import *
+    from .saturation_numpy import __version__
+
+from .cache import SaturationCache, DiskCache
+from .stream import saturate_stream, SaturationStream, read_raw_frames, read_image_frames
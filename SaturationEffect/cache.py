@@ -0,0 +1,404 @@
+"""
+MIT License
+
+Copyright (c) 2019 Yoann Berenguer
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+
+# NUMPY IS REQUIRED
+try:
+    import numpy
+    from numpy import uint8, uint16
+except ImportError:
+    raise ImportError("\n<numpy> library is missing on your system."
+                      "\nTry: \n   C:\\pip install numpy on a window command prompt.")
+
+# PYGAME IS REQUIRED
+try:
+    import pygame
+    from pygame.surfarray import pixels3d, pixels_alpha
+except ImportError:
+    raise ImportError("\n<Pygame> library is missing on your system."
+                      "\nTry: \n   C:\\pip install pygame on a window command prompt.")
+
+from . import saturation_levels, saturation24, saturation32, saturation24_mask, \
+    saturation32_mask, __version__, BACKEND
+
+# Age in seconds after which a temporary file of DiskCache is considered abandoned
+# (process interrupted between the write and the rename)
+TEMPORARY_TIMEOUT = 60 * 60
+
+
+class SaturationCache(object):
+    """
+    CACHE OF PRECOMPUTED SATURATION LEVELS (ANIMATED SATURATION SWEEPS)
+
+    The shift range [-1.0 ... 1.0] is quantized into <levels_> values, the saturated
+    version of a sprite is computed once per level (lazily with get or all levels in
+    a single parallel pass with precompute) and returned from the cache for the
+    next (sprite, level) requests.
+    The cache is limited to <max_bytes_> bytes, the least recently used levels are
+    discarded first. The entries of a sprite are discarded when the sprite is deleted.
+
+    Sprites with per-pixel transparency return a 32-bit surface (same as saturation32)
+    other sprites return a 24-bit surface (same as saturation24).
+    The returned surfaces are shared, do not modify them (use surface.copy()).
+
+    e.g:
+    cache = SaturationCache(levels_=128)
+    cache.precompute(sprite)
+    screen.blit(cache.get(sprite, shift), (0, 0))
+    """
+
+    def __init__(self, levels_=64, max_bytes_=64 * 1024 * 1024, interpolate_=False, linear_=False):
+        """
+        :param levels_     : integer; number of quantized shift values (>= 2) in range [-1.0 ... 1.0]
+        :param max_bytes_  : integer; memory budget of the cache in bytes
+        :param interpolate_: bool; True blend the two levels surrounding the shift value
+        (the result is not cached), False return the nearest level
+        :param linear_     : bool; True the saturation is changed in linear light
+        """
+        assert levels_ >= 2, "\nArgument levels_ must be >= 2 got %s " % levels_
+        assert max_bytes_ > 0, "\nArgument max_bytes_ must be > 0 got %s " % max_bytes_
+
+        self.levels = levels_
+        self.max_bytes = max_bytes_
+        self.interpolate = interpolate_
+        self.linear = linear_
+        self.nbytes = 0
+        # (id(sprite), level) -> pygame.Surface, least recently used first
+        self._entries = OrderedDict()
+        # id(sprite) -> weak reference to the sprite
+        self._sprites = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def level(self, shift_):
+        """
+        RETURN THE NEAREST LEVEL OF A SHIFT VALUE
+
+        :param shift_: float; value in range [-1.0 ... 1.0]
+        :return      : integer; level in range [0 ... levels - 1]
+        """
+        return int(round((shift_ + 1.0) * 0.5 * (self.levels - 1)))
+
+    def shift(self, level_):
+        """
+        RETURN THE SHIFT VALUE OF A LEVEL
+
+        :param level_: integer; level in range [0 ... levels - 1]
+        :return      : float; shift value in range [-1.0 ... 1.0]
+        """
+        return level_ * 2.0 / (self.levels - 1) - 1.0
+
+    def get(self, surface_, shift_):
+        """
+        RETURN THE SATURATED VERSION OF A SPRITE
+
+        :param surface_: pygame.Surface compatible 24-32 bit
+        :param shift_  : float; value in range [-1.0 ... 1.0]
+        :return        : pygame.Surface 24-bit or 32-bit with per-pixel transparency
+        """
+        assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+
+        if not self.interpolate:
+            return self._get_level(surface_, self.level(shift_))
+
+        position = (shift_ + 1.0) * 0.5 * (self.levels - 1)
+        level = min(int(position), self.levels - 2)
+        weight = int((position - level) * 256.0 + 0.5)
+
+        if weight == 0:
+            return self._get_level(surface_, level)
+        if weight == 256:
+            return self._get_level(surface_, level + 1)
+
+        return self._blend(
+            self._get_level(surface_, level), self._get_level(surface_, level + 1), weight)
+
+    def precompute(self, surface_):
+        """
+        COMPUTE ALL THE MISSING LEVELS OF A SPRITE IN A SINGLE PASS
+
+        When the memory budget holds fewer levels than <levels_>, only the levels fitting
+        the budget are computed, evenly spaced in the shift range [-1.0 ... 1.0] (the other
+        levels are computed on demand by get)
+
+        :param surface_: pygame.Surface compatible 24-32 bit
+        :return        : void
+        """
+        width, height = surface_.get_size()
+        bytesize = 4 if surface_.get_flags() & pygame.SRCALPHA else 3
+        count = min(max(self.max_bytes // (width * height * bytesize), 1), self.levels)
+
+        if count == 1:
+            levels = [self.level(0.0)]
+        else:
+            levels = [int(round(i * (self.levels - 1) / (count - 1.0))) for i in range(count)]
+
+        missing = []
+        for level in levels:
+            key = (id(surface_), level)
+            if key in self._entries:
+                # keep the levels already computed (most recently used)
+                self._entries.move_to_end(key)
+            else:
+                missing.append(level)
+        if len(missing) == 0:
+            return
+
+        surfaces = self._compute(surface_, [self.shift(level) for level in missing])
+        for level, surface in zip(missing, surfaces):
+            self._insert(surface_, level, surface)
+
+    def clear(self):
+        """
+        DISCARD ALL THE ENTRIES
+
+        :return: void
+        """
+        self._entries.clear()
+        self._sprites.clear()
+        self.nbytes = 0
+
+    def _get_level(self, surface_, level_):
+        key = (id(surface_), level_)
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+            return surface
+
+        surface = self._compute(surface_, [self.shift(level_)])[0]
+        self._insert(surface_, level_, surface)
+        return surface
+
+    def _compute(self, surface_, shifts_):
+        assert isinstance(surface_, pygame.Surface), \
+            "\nArgument surface_ is invalid, expecting a pygame.Surface got %s " % type(surface_)
+
+        try:
+            rgb_array = pixels3d(surface_)
+            alpha_array = pixels_alpha(surface_) if surface_.get_flags() & pygame.SRCALPHA else None
+        except (ValueError, pygame.error) as e:
+            raise ValueError("\nInvalid surface, surface should be 24-32-bit format \n %s " % e)
+
+        try:
+            return saturation_levels(rgb_array, alpha_array, shifts_, self.linear)
+        finally:
+            del rgb_array, alpha_array
+
+    def _insert(self, surface_, level_, surface):
+        sprite_id = id(surface_)
+        if sprite_id not in self._sprites:
+            self._sprites[sprite_id] = weakref.ref(
+                surface_, lambda ref, cache=weakref.ref(self), sprite_id=sprite_id:
+                cache() is not None and cache()._forget(sprite_id))
+
+        self._entries[(sprite_id, level_)] = surface
+        self.nbytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+        # Discard the least recently used levels (the last entry is always kept)
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, discarded = self._entries.popitem(last=False)
+            self.nbytes -= discarded.get_width() * discarded.get_height() * discarded.get_bytesize()
+
+    def _forget(self, sprite_id):
+        self._sprites.pop(sprite_id, None)
+        for key in [key for key in self._entries if key[0] == sprite_id]:
+            discarded = self._entries.pop(key)
+            self.nbytes -= discarded.get_width() * discarded.get_height() * discarded.get_bytesize()
+
+    @staticmethod
+    def _blend(surface0_, surface1_, weight_):
+        # Linear interpolation of the RGB channels (weight_ in range [0 ... 256])
+        surface = surface0_.copy()
+        rgb_array = pixels3d(surface)
+        rgb_array[...] = ((pixels3d(surface0_).astype(uint16) * (256 - weight_) +
+                           pixels3d(surface1_).astype(uint16) * weight_) >> 8).astype(uint8)
+        del rgb_array
+        return surface
+
+
+class DiskCache(object):
+    """
+    PERSISTENT CACHE OF PROCESSED IMAGES (CONTENT ADDRESSED, MEMORY MAPPED)
+
+    The results of the saturation methods are stored in the directory <path_>, each
+    result is identified by a hash of the method name, the pixels data, the arguments
+    (shift, mask, alpha...) and the version of the saturation module. The next calls
+    with the same data map the stored result into memory (numpy.load mmap_mode='c'
+    copy on write) instead of recomputing it, across runs and processes.
+
+    * The files are raw numpy arrays (.npy) shape (h, w, 3) RGB or (h, w, 4) RGBA
+    * Files are written to a temporary file and renamed (atomic), several worker
+      processes can share the same directory
+    * When the directory exceeds <max_bytes_> the least recently used files are deleted
+      (files still mapped by another process on Windows are skipped), the temporary
+      files older than TEMPORARY_TIMEOUT seconds are deleted
+
+    The methods have the same arguments than the module methods, e.g:
+    cache = DiskCache("cache/saturation")
+    surface = cache.saturation24(array3d(image), 0.5)
+    """
+
+    def __init__(self, path_, max_bytes_=512 * 1024 * 1024):
+        """
+        :param path_     : string; cache directory (created if it does not exist)
+        :param max_bytes_: integer; maximum size in bytes of the cache directory
+        """
+        assert max_bytes_ > 0, "\nArgument max_bytes_ must be > 0 got %s " % max_bytes_
+
+        self.path = path_
+        self.max_bytes = max_bytes_
+        os.makedirs(path_, exist_ok=True)
+
+    def saturation24(self, array_, shift_, subsample_=1, linear_=False):
+        key = self._key('saturation24', array_, shift_, subsample_, linear_)
+        return self._get(key) or self._store(key, saturation24(array_, shift_, subsample_, linear_))
+
+    def saturation32(self, array_, alpha_, shift_, subsample_=1, linear_=False):
+        key = self._key('saturation32', array_, alpha_, shift_, subsample_, linear_)
+        return self._get(key) or self._store(
+            key, saturation32(array_, alpha_, shift_, subsample_, linear_))
+
+    def saturation24_mask(self, array_, shift_, mask_, bilinear_=False, linear_=False):
+        key = self._key('saturation24_mask', array_, shift_, mask_, bilinear_, linear_)
+        return self._get(key) or self._store(
+            key, saturation24_mask(array_, shift_, mask_, bilinear_, linear_))
+
+    def saturation32_mask(self, surface_, shift_, mask_, bilinear_=False, linear_=False):
+        key = self._key('saturation32_mask', surface_, shift_, mask_, bilinear_, linear_)
+        return self._get(key) or self._store(
+            key, saturation32_mask(surface_, shift_, mask_, bilinear_, linear_))
+
+    @property
+    def nbytes(self):
+        """
+        :return: integer; size in bytes of the cached files
+        """
+        return sum(size for _, _, size in self._files())
+
+    def clear(self):
+        """
+        DELETE ALL THE CACHED FILES
+
+        :return: void
+        """
+        for name, _, _ in self._files():
+            self._remove(name)
+
+    @staticmethod
+    def _key(*items):
+        # Hash of the module version and backend, the method name and its arguments (pixels data included)
+        digest = hashlib.blake2b(('%s %s' % (__version__, BACKEND)).encode(), digest_size=20)
+        for item in items:
+            if isinstance(item, pygame.Surface):
+                digest.update(b'surface%dx%d' % item.get_size())
+                item = numpy.dstack((pixels3d(item), pixels_alpha(item))) \
+                    if item.get_bytesize() == 4 else pixels3d(item)
+            if isinstance(item, numpy.ndarray):
+                digest.update(b'array%s%s' % (str(item.shape).encode(), item.dtype.str.encode()))
+                digest.update(numpy.ascontiguousarray(item).data)
+            elif isinstance(item, float):
+                # the kernels use single precision
+                digest.update(struct.pack('<f', item))
+            else:
+                digest.update(repr(item).encode())
+        return digest.hexdigest()
+
+    def _get(self, key_):
+        filename = os.path.join(self.path, key_ + '.npy')
+        try:
+            array = numpy.load(filename, mmap_mode='c')
+            # Last access time used by the eviction
+            os.utime(filename)
+        except (OSError, ValueError):
+            # missing, deleted by another process or incomplete
+            return None
+
+        height, width, bytesize = array.shape
+        return pygame.image.frombuffer(array, (width, height), 'RGB' if bytesize == 3 else 'RGBA')
+
+    def _store(self, key_, surface_):
+        width, height = surface_.get_size()
+        bytesize = 4 if surface_.get_flags() & pygame.SRCALPHA else 3
+
+        array = numpy.empty((height, width, bytesize), dtype=uint8)
+        array[:, :, :3] = pixels3d(surface_).transpose(1, 0, 2)
+        if bytesize == 4:
+            array[:, :, 3] = pixels_alpha(surface_).transpose(1, 0)
+
+        # Write a temporary file then rename it, the readers never see a partial file
+        handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(handle, 'wb') as file_:
+                numpy.save(file_, array)
+            os.replace(temporary, os.path.join(self.path, key_ + '.npy'))
+        except OSError:
+            # the file is mapped by another process (Windows), keep the existing file
+            self._remove(os.path.basename(temporary))
+
+        self._evict()
+        return surface_
+
+    def _files(self, suffix_='.npy'):
+        files = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(suffix_):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((entry.name, stat.st_mtime, stat.st_size))
+        return files
+
+    def _evict(self):
+        # Temporary files abandoned by an interrupted process
+        now = time.time()
+        for name, mtime, _ in self._files('.tmp'):
+            if now - mtime > TEMPORARY_TIMEOUT:
+                self._remove(name)
+
+        files = self._files()
+        total = sum(size for _, _, size in files)
+        # least recently used first
+        for name, _, size in sorted(files, key=lambda file_: file_[1]):
+            if total <= self.max_bytes:
+                break
+            if self._remove(name):
+                total -= size
+
+    def _remove(self, name_):
+        try:
+            os.remove(os.path.join(self.path, name_))
+            return True
+        except OSError:
+            # already deleted by another process or still mapped (Windows)
+            return False
@@ -48,11 +48,40 @@ cdef struct xyz:
     int y;
     int z;
 
-cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_)
+# C-structure describing the pixel format of a buffer
+# (byte offset of each channel, -1 when the alpha channel is missing,
+# bytes per pixel and number of bytes per row)
+cdef struct pixel_format:
+    int r;
+    int g;
+    int b;
+    int a;
+    int bytesize;
+    int pitch;
 
-cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_)
+cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_, int scale_)
 
-cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_)
+cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_, int scale_)
+
+cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_, int scale_)
+
+cdef inline int mask_scale_c(int width, int height, int mask_width, int mask_height) nogil
+
+cdef inline int block_scale_c(int width, int height, int scale_) nogil
+
+cdef inline float mask_value_c(
+        float [:, :] mask_array,
+        int i,
+        int j,
+        int mask_scale,
+        bint bilinear_
+) nogil
+
+cdef void srgb_tables_c()
+
+cdef inline double srgb_decode_c(unsigned char value, bint linear_) nogil
+
+cdef inline unsigned char srgb_encode_c(double value, bint linear_) nogil
 
 cdef inline object saturation_array24_mask_c(
         unsigned char [:, :, :] rgb_array_,
@@ -60,6 +89,9 @@ cdef inline object saturation_array24_mask_c(
         float [:, :] mask_array,
         int width,
         int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         )
 
 cdef inline object saturation_array24_mask_c1(
@@ -68,6 +100,9 @@ cdef inline object saturation_array24_mask_c1(
         float [:, :] mask_array,
         int width,
         int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         )
 cdef inline object saturation_array32_mask_c1(
         unsigned char[:, :, :] rgb_array_,
@@ -75,41 +110,104 @@ cdef inline object saturation_array32_mask_c1(
         float shift_,
         float [:, :] mask_array,
         int width,
-        int height
+        int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         )
 cdef inline object saturation_array32_mask_c(
         object surface_,
         float shift_,
         float [:, :] mask_array,
         int width,
-        int height
+        int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         )
 cdef inline object saturation_array24_c(
         unsigned char [:, :, :] array_,
         float shift_,
         int width,
-        int height
+        int height,
+        bint linear_
 )
 cdef inline object saturation_array32_c(
         unsigned char [:, :, :] array_,
         unsigned char [:, :] alpha_,
         float shift_,
         int width,
+        int height,
+        bint linear_
+)
+cdef inline void saturation_levels_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        float [::1] shifts_,
+        list outputs_,
+        int width,
+        int height,
+        bint linear_
+) except *
+cdef inline double saturation_histogram_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        long long [:, ::1] histograms_,
+        int width,
         int height
 )
+cdef inline float auto_shift_c(long long [::1] histogram_, float target_mean, float smax)
+cdef inline object saturation_array_subsample_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        float shift_,
+        int width,
+        int height,
+        int subsample_,
+        float smax_
+)
+cdef pixel_format pixel_format_c(str format_, int width, int pitch_) except *
+cdef buffer_view_c(buffer_, shift_, mask_array, int width, int height, pixel_format format_c, bint readonly)
 cdef saturation_buffer_mask_c(
-        unsigned char [::1] buffer_,
+        const unsigned char [::1] buffer_,
         float shift_,
         float [::1] mask_array,
         int width,
-        int height
+        int height,
+        pixel_format format_c,
+        bint linear_
 )
 cdef inline void saturation_buffer_mask_inplace_c(
         unsigned char [::1] buffer_,
         float shift_,
         float [::1] mask_array,
         int width,
-        int height
+        int height,
+        pixel_format format_c,
+        bint linear_
 )
-cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_, float shift_)
-cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array_, float shift_)
+cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_, float shift_, bint linear_)
+cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array_, float shift_, bint linear_)
+
+# C API, nogil functions working on raw pointers (see saturation.pyx)
+cdef api void saturate_rgb_row(
+        unsigned char * row_,
+        int width,
+        int pixel_stride,
+        float shift_
+) nogil
+cdef api void saturate_rgb_tile(
+        unsigned char * tile_,
+        int width,
+        int height,
+        int pixel_stride,
+        Py_ssize_t row_stride,
+        float shift_
+) nogil
+cdef api void saturate_rgba_tile(
+        unsigned char * tile_,
+        int width,
+        int height,
+        Py_ssize_t row_stride,
+        float shift_
+) nogil
@@ -42,7 +42,7 @@ except ImportError:
 # CYTHON IS REQUIRED
 try:
     cimport cython
-    from cython.parallel cimport prange
+    from cython.parallel cimport prange, threadid
 except ImportError:
     raise ImportError("\n<cython> library is missing on your system."
           "\nTry: \n   C:\\pip install cython on a window command prompt.")
@@ -59,8 +59,8 @@ except ImportError:
           "\nTry: \n   C:\\pip install pygame on a window command prompt.")
 
 from libc.stdio cimport printf
-from libc.stdlib cimport free
-from libc.math cimport fmax, fmin
+from libc.stdlib cimport malloc, free
+from libc.math cimport fmax, fmin, pow
 
 cimport numpy as np
 
@@ -91,8 +91,15 @@ DEF ONE_255 = 1.0/255.0
 DEF ONE_360 = 1.0/360.0
 DEF TWO_THIRD = 2.0/3.0
 
+# sRGB TRANSFER FUNCTION LOOKUP TABLES (see argument linear_, srgb_decode_c and srgb_encode_c)
+# srgb_to_linear : sRGB byte value -> linear light value [0.0 ... 1.0]
+# linear_to_srgb : linear light value quantized on 4096 levels -> sRGB byte value
+DEF LINEAR_LEVELS = 4096
+cdef float srgb_to_linear[256]
+cdef unsigned char linear_to_srgb[LINEAR_LEVELS]
 
-cpdef saturation24_mask(array_, shift_, mask_):
+
+cpdef saturation24_mask(array_, shift_, mask_, bint bilinear_=False, bint linear_=False):
     assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
 
     assert isinstance(array_, numpy.ndarray),\
@@ -101,7 +108,7 @@ cpdef saturation24_mask(array_, shift_, mask_):
         "\nInvalid array data type expecting uint8 got type %s " % array_.dtype
 
     cdef:
-        int w, h, mw, mh
+        int w, h, mw, mh, mask_scale = 1
 
     try:
         w, h, bytesize = array_.shape
@@ -124,20 +131,23 @@ cpdef saturation24_mask(array_, shift_, mask_):
             raise ValueError("\nMask argument is invalid "
                              "expecting type (w, h) \n %s " %e)
 
-        assert w == mw and h == mh, "\nArray and mask mismatch width or height"
+        mask_scale = mask_scale_c(w, h, mw, mh)
+        assert mask_scale > 0, "\nArray and mask mismatch width or height"
+        # The kernels read float32 values (float64 masks are converted)
+        mask_ = mask_.astype(numpy.float32, copy=False)
 
-    return saturation_array24_mask_c(array_, shift_, mask_, w, h)
+    return saturation_array24_mask_c(array_, shift_, mask_, w, h, mask_scale, bilinear_, linear_)
 
 
 
-cpdef saturation24_mask1(surface_, shift_, mask_):
+cpdef saturation24_mask1(surface_, shift_, mask_, bint bilinear_=False, bint linear_=False):
     assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
 
     assert isinstance(surface_, pygame.Surface),\
         "\nInvalid surface type, expecting a pygame.Surface type got type %s " % type(surface_)
 
     cdef:
-        int w, h, mw, mh
+        int w, h, mw, mh, mask_scale = 1
 
     w, h = surface_.get_size()
 
@@ -156,12 +166,15 @@ cpdef saturation24_mask1(surface_, shift_, mask_):
             raise ValueError("\nMask argument is invalid "
                              "expecting type (w, h) \n %s " %e)
 
-        assert w == mw and h == mh, "\nArray and mask mismatch width or height"
+        mask_scale = mask_scale_c(w, h, mw, mh)
+        assert mask_scale > 0, "\nArray and mask mismatch width or height"
+        # The kernels read float32 values (float64 masks are converted)
+        mask_ = mask_.astype(numpy.float32, copy=False)
 
-    return saturation_array24_mask_c1(surface_, shift_, mask_, w, h)
+    return saturation_array24_mask_c1(surface_, shift_, mask_, w, h, mask_scale, bilinear_, linear_)
 
 
-cpdef saturation32_mask(surface_, shift_, mask_):
+cpdef saturation32_mask(surface_, shift_, mask_, bint bilinear_=False, bint linear_=False):
 
 
     assert -1.0 <= shift_ <= 1.0, \
@@ -169,7 +182,7 @@ cpdef saturation32_mask(surface_, shift_, mask_):
     assert surface_.get_bytesize() == 4, \
         "\nInvalid surface, the alpha channel is missing. \nImage byte size %s " % surface_.get_bytesize()
     cdef:
-        int w, h, mw, mh
+        int w, h, mw, mh, mask_scale = 1
 
     w, h = surface_.get_size()
 
@@ -189,12 +202,15 @@ cpdef saturation32_mask(surface_, shift_, mask_):
             raise ValueError("\nMask argument is invalid "
                              "expecting type (w, h) \n %s " % e)
 
-        assert w == mw and h == mh, "\nArray and mask mismatch width or height"
+        mask_scale = mask_scale_c(w, h, mw, mh)
+        assert mask_scale > 0, "\nArray and mask mismatch width or height"
+        # The kernels read float32 values (float64 masks are converted)
+        mask_ = mask_.astype(numpy.float32, copy=False)
 
-    return saturation_array32_mask_c(surface_, shift_, mask_, w, h)
+    return saturation_array32_mask_c(surface_, shift_, mask_, w, h, mask_scale, bilinear_, linear_)
 
 
-cpdef saturation32_mask1(rgb_array_, alpha_array_, shift_, mask_):
+cpdef saturation32_mask1(rgb_array_, alpha_array_, shift_, mask_, bint bilinear_=False, bint linear_=False):
 
         assert -1.0 <= shift_ <= 1.0, \
             '\nshift_ argument must be in range [-1.0 .. 1.0].'
@@ -204,7 +220,7 @@ cpdef saturation32_mask1(rgb_array_, alpha_array_, shift_, mask_):
             "\nArgument alpha_array_ is invalid expecting a numpy.ndarray got %s " % type(alpha_array_)
 
         cdef:
-            int w, h, mw, mh
+            int w, h, mw, mh, mask_scale = 1
 
         try:
             w, h, bytesize = rgb_array_.shape
@@ -231,18 +247,34 @@ cpdef saturation32_mask1(rgb_array_, alpha_array_, shift_, mask_):
                 raise ValueError("\nMask argument is invalid "
                                  "expecting type (w, h) \n %s " % e)
 
-            assert w == mw and h == mh, "\nArray and mask mismatch width or height"
+            mask_scale = mask_scale_c(w, h, mw, mh)
+            assert mask_scale > 0, "\nArray and mask mismatch width or height"
+            # The kernels read float32 values (float64 masks are converted)
+            mask_ = mask_.astype(numpy.float32, copy=False)
 
-        return saturation_array32_mask_c1(rgb_array_, alpha_array_, shift_, mask_, w, h)
+        return saturation_array32_mask_c1(rgb_array_, alpha_array_, shift_, mask_, w, h, mask_scale, bilinear_, linear_)
 
 
 
 
 
 # APPLY SATURATION TO AN RGB ARRAY
-cpdef inline object saturation24(array_, shift_):
+cpdef inline object saturation24(array_, shift_, int subsample_=1, bint linear_=False):
+    """
+    CHANGE SATURATION LEVEL 
+    
+    :param array_    : numpy.ndarray (w, h, 3) uint8 representing a 24-32 bit surface
+    :param shift_    : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param subsample_: integer; 1 exact HSL transformation (default), n > 1 approximation with 
+    the saturation gain computed per block nxn, e.g 2 or 4 (faster, see saturation_array_subsample_c)
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB values decoded 
+    and encoded with lookup tables), False the sRGB values are used directly (default)
+    :return: Return a pygame.Surface 24-bit without per-pixel information 
+    """
 
     assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+    assert subsample_ >= 1, '\nArgument subsample_ must be >= 1 got %s ' % subsample_
+    assert not (linear_ and subsample_ > 1), '\nArgument linear_ is not compatible with subsample_ > 1'
 
     cdef int width, height
 
@@ -251,12 +283,29 @@ cpdef inline object saturation24(array_, shift_):
     except (pygame.error, ValueError) as e:
         raise ValueError('\nArray type <array_> not understood \n%s ' % e)
 
-    return saturation_array24_c(array_, shift_, width, height)
+    if subsample_ > 1:
+        return saturation_array_subsample_c(array_, None, shift_, width, height, subsample_, 0.5)
 
+    return saturation_array24_c(array_, shift_, width, height, linear_)
 
-cpdef inline object saturation32(array_, alpha_, shift_):
+
+cpdef inline object saturation32(array_, alpha_, shift_, int subsample_=1, bint linear_=False):
+    """
+    CHANGE SATURATION LEVEL 
+    
+    :param array_    : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param alpha_    : numpy.ndarray (w, h) uint8 representing the alpha channel 
+    :param shift_    : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param subsample_: integer; 1 exact HSL transformation (default), n > 1 approximation with 
+    the saturation gain computed per block nxn, e.g 2 or 4 (faster, see saturation_array_subsample_c)
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB values decoded 
+    and encoded with lookup tables), False the sRGB values are used directly (default)
+    :return: a pygame.Surface 32-bit with per-pixel information 
+    """
 
     assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+    assert subsample_ >= 1, '\nArgument subsample_ must be >= 1 got %s ' % subsample_
+    assert not (linear_ and subsample_ > 1), '\nArgument linear_ is not compatible with subsample_ > 1'
 
     cdef int width, height, alpha_width, alpha_height
 
@@ -273,38 +322,277 @@ cpdef inline object saturation32(array_, alpha_, shift_):
     assert width == alpha_width and height == alpha_height, \
         "rgb array and alpha channel mismatch width or height "
 
-    return saturation_array32_c(array_, alpha_, shift_, width, height)
+    if subsample_ > 1:
+        return saturation_array_subsample_c(array_, alpha_, shift_, width, height, subsample_, 1.0)
+
+    return saturation_array32_c(array_, alpha_, shift_, width, height, linear_)
+
+
+cpdef list saturation_levels(array_, alpha_, shifts_, bint linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN IMAGE FOR SEVERAL SHIFT VALUES (SINGLE PASS)
+    
+    The HSL conversion of each pixel is done once for all the shift values, this is 
+    faster than calling saturation24 / saturation32 for each value (e.g precompute 
+    all the frames of an animated saturation sweep, see SaturationCache).
+    The results are identical to saturation24 (alpha_ is None) or saturation32.
+    
+    :param array_ : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param alpha_ : numpy.ndarray (w, h) uint8 representing the alpha channel or None 
+    :param shifts_: sequence of float; each value must be in range [-1.0 ... 1.0]
+    :param linear_: bool; True the saturation is changed in linear light (sRGB values decoded 
+    before the HSL conversion and encoded after), False sRGB values (default)
+    :return       : list of pygame.Surface (one per shift value) 24-bit when alpha_ is None 
+    else 32-bit with per-pixel information 
+    """
+    cdef int width, height, bytesize
+
+    try:
+        width, height = array_.shape[:2]
+    except (ValueError, pygame.error, AttributeError) as e:
+        raise ValueError('\nArray <array_> type not understood \n%s ' % e)
+
+    if alpha_ is not None:
+        assert (width, height) == alpha_.shape[:2], \
+            "rgb array and alpha channel mismatch width or height "
 
+    cdef float [::1] shifts = numpy.ascontiguousarray(shifts_, dtype=float32).ravel()
+    assert (numpy.asarray(shifts) >= -1.0).all() and (numpy.asarray(shifts) <= 1.0).all(), \
+        '\nArgument shifts_ values must be in range [-1.0 .. 1.0].'
 
-# # APPLY SATURATION TO AN RGB BUFFER USING A MASK(COMPATIBLE SURFACE 24 BIT)
-# def saturation_buffer_mask(buffer_, shift_, mask_array):
-#     return saturation_buffer_mask_c(buffer_, shift_, mask_array)
+    bytesize = 3 if alpha_ is None else 4
+    outputs = [empty((height, width, bytesize), dtype=uint8) for _ in range(len(shifts))]
 
+    if len(outputs) > 0:
+        saturation_levels_c(array_, alpha_, shifts, outputs, width, height, linear_)
 
-cpdef saturation_buffer_mask(buffer_, shift_, mask_array, width_, height_):
-    return saturation_buffer_mask_c(buffer_, shift_, mask_array, width_, height_)
+    return [pygame.image.frombuffer(
+        output, (width, height), 'RGB' if bytesize == 3 else 'RGBA') for output in outputs]
 
-cpdef saturation_buffer_mask_inplace(buffer_, shift_, mask_array, width_, height_):
-    return saturation_buffer_mask_inplace_c(buffer_, shift_, mask_array, width_, height_)
 
+cpdef dict saturation_stats(array_, alpha_=None, int bins_=256, percentiles_=(5.0, 50.0, 95.0)):
+    """
+    HSL SATURATION STATISTICS OF AN IMAGE (HISTOGRAM, MEAN AND PERCENTILES)
+    
+    Single parallel pass over the pixels (see saturation_histogram_c), the percentiles 
+    are interpolated from the histogram (precision 1.0 / bins_). 
+    Transparent pixels (alpha value 0) are ignored when alpha_ is given.
+    
+    :param array_      : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param alpha_      : numpy.ndarray (w, h) uint8 representing the alpha channel or None 
+    :param bins_       : integer; number of histogram bins over the saturation range [0.0 ... 1.0]
+    :param percentiles_: sequence of float; percentiles in range [0.0 ... 100.0]
+    :return            : dict {'histogram': numpy.ndarray (bins_,) int64, 'count': number of 
+    pixels, 'mean': mean saturation, 'percentiles': numpy.ndarray float32 saturation values}
+    """
+    assert bins_ > 0, '\nArgument bins_ must be > 0 got %s ' % bins_
+
+    cdef int width, height
+
+    try:
+        width, height = array_.shape[:2]
+    except (ValueError, pygame.error, AttributeError) as e:
+        raise ValueError('\nArray <array_> type not understood \n%s ' % e)
+
+    if alpha_ is not None:
+        assert (width, height) == alpha_.shape[:2], \
+            "rgb array and alpha channel mismatch width or height "
+
+    percentiles = numpy.asarray(percentiles_, dtype=float64).ravel()
+    assert ((percentiles >= 0.0) & (percentiles <= 100.0)).all(), \
+        '\nArgument percentiles_ values must be in range [0.0 .. 100.0].'
+
+    # One histogram per thread, merged after the parallel pass
+    histograms = numpy.zeros((THREADS, bins_), dtype=numpy.int64)
+    cdef double total = saturation_histogram_c(array_, alpha_, histograms, width, height)
+
+    histogram = histograms.sum(axis=0)
+    cdef long long count = histogram.sum()
+
+    values = numpy.zeros(len(percentiles), dtype=float32)
+    if count > 0:
+        cumulative = histogram.cumsum()
+        rank = percentiles * 0.01 * count
+        index = numpy.minimum(numpy.searchsorted(cumulative, rank), bins_ - 1)
+        before = cumulative[index] - histogram[index]
+        fraction = (rank - before) / numpy.maximum(histogram[index], 1)
+        values[:] = (index + numpy.clip(fraction, 0.0, 1.0)) / bins_
+
+    return {'histogram': histogram,
+            'count': count,
+            'mean': total / count if count > 0 else 0.0,
+            'percentiles': values}
+
+
+cpdef object auto_saturation(array_, float target_mean, alpha_=None, int bins_=256):
+    """
+    CHANGE THE SATURATION LEVEL TO REACH A GIVEN MEAN SATURATION
+    
+    Two passes over the pixels; the first builds the saturation histogram 
+    (saturation_stats), the shift value giving the mean <target_mean> is then 
+    solved on the histogram (auto_shift_c) and the second pass applies it with 
+    saturation24 (alpha_ is None) or saturation32. 
+    Note that saturation24 cannot exceed a saturation of 0.5
+    
+    :param array_     : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param target_mean: float; mean saturation wanted, in range [0.0 ... 1.0]
+    :param alpha_     : numpy.ndarray (w, h) uint8 representing the alpha channel or None 
+    :param bins_      : integer; number of histogram bins 
+    :return           : pygame.Surface 24-bit when alpha_ is None else 32-bit with per-pixel 
+    information
+    """
+    assert 0.0 <= target_mean <= 1.0, '\nArgument target_mean must be in range [0.0 .. 1.0].'
+
+    stats = saturation_stats(array_, alpha_, bins_, ())
+    cdef float shift = auto_shift_c(stats['histogram'], target_mean, 0.5 if alpha_ is None else 1.0)
 
-cpdef inline object saturation24_inplace(array_, shift_):
+    if alpha_ is None:
+        return saturation24(array_, shift)
+    return saturation32(array_, alpha_, shift)
+
+
+# APPLY SATURATION TO A BUFFER (ANY PIXEL FORMAT, OPTIONAL MASK)
+cpdef saturation_buffer_mask(buffer_, shift_, mask_array, width_, height_, format_='RGB', pitch_=0,
+                             bint linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A BUFFER (RETURN A NEW SURFACE)
+    
+    The buffer can be any object exposing the buffer protocol (bytes, bytearray, mmap, 
+    numpy.ndarray, pygame.BufferProxy etc), the data is referenced (no copy).
+    
+    :param buffer_   : buffer containing the pixels, rows of <width_> pixels separated by <pitch_> bytes
+    :param shift_    : float; Value must be in range [-1.0 ... 1.0]
+    :param mask_array: 1d numpy.ndarray float32 or float64 of width_ * height_ values (row order) or None. 
+    Pixels with a mask value <= 0.0 are left unchanged 
+    :param width_    : integer; width of the image
+    :param height_   : integer; height of the image
+    :param format_   : string; channel order e.g 'RGB', 'BGR', 'RGBA', 'BGRA', 'ARGB', 'RGBX', 
+    (the bytes per pixel is the length of the string)
+    :param pitch_    : integer; number of bytes per row (including padding), 0 for packed rows
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB values decoded 
+    before the HSL conversion and encoded after), False sRGB values (default)
+    :return          : a pygame.Surface 24-bit (RGB) or 32-bit (RGBA) when the format 
+    contains an alpha channel
+    """
+    cdef pixel_format format_c = pixel_format_c(format_, width_, pitch_)
+    buffer_ = buffer_view_c(buffer_, shift_, mask_array, width_, height_, format_c, True)
+    if mask_array is not None:
+        mask_array = numpy.ascontiguousarray(mask_array, dtype=numpy.float32)
+    return saturation_buffer_mask_c(buffer_, shift_, mask_array, width_, height_, format_c, linear_)
+
+cpdef saturation_buffer_mask_inplace(buffer_, shift_, mask_array, width_, height_, format_='RGB', pitch_=0,
+                                     bint linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A BUFFER (INPLACE)
+    
+    Same arguments than saturation_buffer_mask, the buffer must be writable 
+    
+    :return: void
+    """
+    cdef pixel_format format_c = pixel_format_c(format_, width_, pitch_)
+    buffer_ = buffer_view_c(buffer_, shift_, mask_array, width_, height_, format_c, False)
+    if mask_array is not None:
+        mask_array = numpy.ascontiguousarray(mask_array, dtype=numpy.float32)
+    saturation_buffer_mask_inplace_c(buffer_, shift_, mask_array, width_, height_, format_c, linear_)
+
+
+cdef pixel_format pixel_format_c(str format_, int width, int pitch_) except *:
+    """
+    RETURN THE PIXEL FORMAT DESCRIPTOR OF A BUFFER 
+    
+    :param format_: string; channel order composed of R, G, B and optionally A (alpha) 
+    or X (unused byte) e.g 'RGB', 'BGR', 'RGBA', 'BGRA', 'ARGB', 'RGBX'
+    :param width  : integer; width of the image
+    :param pitch_ : integer; number of bytes per row, 0 for packed rows
+    :return       : pixel_format structure (channel offsets, bytes per pixel and row pitch)
+    """
+    cdef pixel_format format_c
+
+    format_ = format_.upper()
+    if len(format_) not in (3, 4) or \
+            format_.count('R') != 1 or format_.count('G') != 1 or format_.count('B') != 1 or \
+            (len(format_) == 4 and format_.count('A') + format_.count('X') != 1):
+        raise ValueError("\nPixel format not understood, expecting a channel order "
+                         "such as 'RGB', 'BGR', 'RGBA', 'BGRA' got %s " % format_)
+
+    format_c.r = format_.index('R')
+    format_c.g = format_.index('G')
+    format_c.b = format_.index('B')
+    format_c.a = format_.find('A')
+    format_c.bytesize = len(format_)
+    format_c.pitch = pitch_ if pitch_ != 0 else width * format_c.bytesize
+
+    if format_c.pitch < width * format_c.bytesize:
+        raise ValueError("\nRow pitch is too small, expecting at least %s got %s "
+                         % (width * format_c.bytesize, format_c.pitch))
+    return format_c
+
+
+cdef buffer_view_c(buffer_, shift_, mask_array, int width, int height, pixel_format format_c, bint readonly):
+    """
+    CHECK THE ARGUMENTS AND RETURN A FLAT VIEW (UNSIGNED CHAR) OF THE BUFFER
+    
+    :param buffer_   : any object exposing the buffer protocol 
+    :param shift_    : float; Value must be in range [-1.0 ... 1.0]
+    :param mask_array: 1d numpy.ndarray or None
+    :param width     : integer; width of the image
+    :param height    : integer; height of the image
+    :param format_c  : pixel_format structure
+    :param readonly  : bool; False if the buffer will be modified
+    :return          : a memoryview 1d (unsigned char) referencing the buffer
+    """
+
+    assert isinstance(shift_, float), \
+           'Expecting float for argument shift_, got %s ' % type(shift_)
+    assert -1.0 <= shift_ <= 1.0, 'Argument shift_ must be in range [-1.0 .. 1.0].'
+
+    cdef int b_length, m_length
+
+    try:
+        view_ = memoryview(buffer_)
+        if view_.ndim != 1 or view_.format != 'B':
+            view_ = view_.cast('B')
+    except (TypeError, ValueError) as e:
+        raise ValueError("\nIncompatible buffer type got %s.\n%s " % (type(buffer_), e))
+
+    if not readonly and view_.readonly:
+        raise ValueError("\nBuffer is read-only, expecting a writable buffer got %s." % type(buffer_))
+
+    b_length = len(view_)
+    if b_length < (height - 1) * format_c.pitch + width * format_c.bytesize:
+        raise ValueError(
+            "\nBuffer length is too small for the image size and pixel format, %s " % b_length)
+
+    if mask_array is not None:
+        try:
+            m_length = len(<object>mask_array)
+        except (ValueError, TypeError) as e:
+            raise ValueError("\nIncompatible mask type got %s." % type(mask_array))
+
+        if m_length != width * height:
+            raise ValueError(
+                "\nMask length and image size mismatch, %s %s" % (width * height, m_length))
+
+    return view_
+
+
+cpdef inline object saturation24_inplace(array_, shift_, bint linear_=False):
 
     assert -1.0 <= shift_ <= 1.0, \
         "Argument shift must be in range[-1.0 ... 1.0]"
 
-    saturation_array24_inplace_c(array_, shift_)
+    saturation_array24_inplace_c(array_, shift_, linear_)
 
-cpdef inline object saturation32_inplace(array_, shift_):
+cpdef inline object saturation32_inplace(array_, shift_, bint linear_=False):
 
     assert -1.0 <= shift_ <= 1.0, \
         "Argument shift must be in range[-1.0 ... 1.0]"
 
-    saturation_array32_inplace_c(array_, shift_)
+    saturation_array32_inplace_c(array_, shift_, linear_)
 
 # ----------------IMPLEMENTATION -----------------
 
-cpdef inline object build_mask2d_grayscale(object surface_):
+cpdef inline object build_mask2d_grayscale(object surface_, int scale_=1):
     """
     BUILD A MASK FROM A SURFACE (GRAYSCALE)
     
@@ -314,17 +602,25 @@ cpdef inline object build_mask2d_grayscale(object surface_):
     * This function return a mask (array) shape (w, h) with normalized value. 
       The value correspond to the gray magnitude of the original image (image converted
       to a grayscale format and normalized) 
+    * When scale_ > 1 the mask is built at a reduced resolution shape 
+      (ceil(w / scale_), ceil(h / scale_)), each value being the average of a block 
+      scale_ x scale_ pixels. The saturation methods will upsample the mask on the fly.
+      The blocks are smaller than scale_ when a smaller factor gives the same mask size 
+      (small images, see block_scale_c).
         
     :param surface_: pygame.Surface compatible 24-32 bit  
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0]. Normalized array
     """
 
     assert isinstance(surface_, pygame.Surface), \
         "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
 
-    return build_mask2d_grayscale_c(surface_)
+    width, height = surface_.get_size()
+    return build_mask2d_grayscale_c(surface_, block_scale_c(width, height, scale_))
 
-cpdef inline object build_mask2d_bw(object surface_):
+cpdef inline object build_mask2d_bw(object surface_, int scale_=1):
     """
     BUILD A MASK FROM A SURFACE (BLACK AND WHITE)
     
@@ -333,16 +629,24 @@ cpdef inline object build_mask2d_bw(object surface_):
       channel is disregarded) 
     * This function return a mask (array) shape (w, h) with normalized value. 
       The values are either 1.0 or 0.0 (1.0 when the grayscale value is >0.0 else 0.0)
+    * When scale_ > 1 the mask is built at a reduced resolution shape 
+      (ceil(w / scale_), ceil(h / scale_)), a value is set to 1.0 when any pixel of 
+      the block scale_ x scale_ has a grayscale value > 0.0
+      The blocks are smaller than scale_ when a smaller factor gives the same mask size 
+      (small images, see block_scale_c).
     
     :param surface_: pygame.Surface compatible 24-32 bit  
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0]. Normalized array
     """
     assert isinstance(surface_, pygame.Surface), \
         "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
 
-    return build_mask2d_bw_c(surface_)
+    width, height = surface_.get_size()
+    return build_mask2d_bw_c(surface_, block_scale_c(width, height, scale_))
 
-cpdef inline object build_mask2d_alpha(object surface_):
+cpdef inline object build_mask2d_alpha(object surface_, int scale_=1):
     """
     BUILD A MASK FROM A SURFACE (ALPHA)
     
@@ -351,8 +655,14 @@ cpdef inline object build_mask2d_alpha(object surface_):
     * Compatible with surface 32-bit with alpha channel), this method will raised a ValueError
     if the image is not a 32 bit with alpha channel.  
     * This function return a mask (array) shape (w, h) of normalized values, alpha channel values /255
+    * When scale_ > 1 the mask is built at a reduced resolution shape 
+      (ceil(w / scale_), ceil(h / scale_)), each value being the average alpha of a block 
+      scale_ x scale_ pixels.
+      The blocks are smaller than scale_ when a smaller factor gives the same mask size 
+      (small images, see block_scale_c).
     
     :param surface_: pygame.Surface compatible 32 bit only with alpha channel  
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0] corresponding 
     to the channel alpha values / 255
     """
@@ -360,14 +670,16 @@ cpdef inline object build_mask2d_alpha(object surface_):
         "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
     assert surface_.get_bytesize() == 4, \
         "\nInvalid surface, the alpha channel is missing. \nImage byte size %s " % surface_.get_bytesize()
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
 
-    return build_mask2d_alpha_c(surface_)
+    width, height = surface_.get_size()
+    return build_mask2d_alpha_c(surface_, block_scale_c(width, height, scale_))
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
-cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_):
+cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_, int scale_):
     """
     BUILD A MASK FROM A SURFACE (GRAYSCALE)
     
@@ -379,6 +691,7 @@ cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_):
       to a grayscale format and normalized) 
         
     :param surface_: pygame.Surface compatible 24-32 bit  
+    :param scale_  : integer; reduction factor (per axis) of the mask
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0]. Normalized array
     """
 
@@ -386,17 +699,19 @@ cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_):
         "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
 
     cdef:
-        int width, height
+        int width, height, mask_width, mask_height
     width, height = surface_.get_size()
+    mask_width  = (width + scale_ - 1) // scale_
+    mask_height = (height + scale_ - 1) // scale_
 
     cdef:
         unsigned char [:, :, :] rgb_array
-        float [:, :] mask = zeros((width, height), float32)
+        float [:, :] mask = zeros((mask_width, mask_height), float32)
         unsigned char *r
         unsigned char *g
         unsigned char *b
         float gray_value = 0.0
-        int i, j
+        int i, j, ii, jj, count
 
     try:
         rgb_array = pixels3d(surface_)
@@ -405,15 +720,30 @@ cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_):
 
     with nogil:
 
-        for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
-            for j in range(height):
+        if scale_ == 1:
+            for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(height):
 
-                r = &rgb_array[i, j, 0]
-                g = &rgb_array[i, j, 1]
-                b = &rgb_array[i, j, 2]
-                gray_value = <float>(r[0] + g[0] + b[0]) / 3.0
-                # Normalized value
-                mask[i, j] = <float>(gray_value * ONE_255)
+                    r = &rgb_array[i, j, 0]
+                    g = &rgb_array[i, j, 1]
+                    b = &rgb_array[i, j, 2]
+                    gray_value = <float>(r[0] + g[0] + b[0]) / 3.0
+                    # Normalized value
+                    mask[i, j] = <float>(gray_value * ONE_255)
+        else:
+            for i in prange(mask_width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(mask_height):
+
+                    # Average of the block scale_ x scale_
+                    gray_value = 0.0
+                    count = 0
+                    for ii in range(i * scale_, min((i + 1) * scale_, width)):
+                        for jj in range(j * scale_, min((j + 1) * scale_, height)):
+                            gray_value = gray_value + \
+                                rgb_array[ii, jj, 0] + rgb_array[ii, jj, 1] + rgb_array[ii, jj, 2]
+                            count = count + 1
+                    # Normalized value
+                    mask[i, j] = <float>(gray_value / (3.0 * count) * ONE_255)
     return asarray(mask, dtype=float32)
 
 
@@ -421,7 +751,7 @@ cdef inline np.ndarray[np.float32_t, ndim=3] build_mask2d_grayscale_c(surface_):
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
-cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_):
+cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_, int scale_):
     """
     BUILD A MASK FROM A SURFACE (BLACK AND WHITE)
     
@@ -432,21 +762,24 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_):
       The values are either 1.0 or 0.0 (1.0 when the grayscale value is >0.0 else 0.0)
     
     :param surface_: pygame.Surface compatible 24-32 bit  
+    :param scale_  : integer; reduction factor (per axis) of the mask
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0]. Normalized array
     """
 
     cdef:
-        int width, height
+        int width, height, mask_width, mask_height
     width, height = surface_.get_size()
+    mask_width  = (width + scale_ - 1) // scale_
+    mask_height = (height + scale_ - 1) // scale_
 
     cdef:
         unsigned char [:, :, :] rgb_array
-        float [:, :] mask = empty((width, height), float32)
+        float [:, :] mask = empty((mask_width, mask_height), float32)
         unsigned char *r
         unsigned char *g
         unsigned char *b
         float gray_value = 0.0
-        int i, j
+        int i, j, ii, jj
 
     try:
         rgb_array = pixels3d(surface_)
@@ -454,16 +787,30 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_):
         raise ValueError("\nSurface cannot be referenced.\n%s " % e)
 
     with nogil:
-        for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
-            for j in range(height):
-                r = &rgb_array[i, j, 0]
-                g = &rgb_array[i, j, 1]
-                b = &rgb_array[i, j, 2]
-                gray_value = (r[0] + g[0] + b[0]) / 3.0
-                if gray_value > 0:
-                    mask[i, j] = 1.0
-                else:
-                    mask[i, j] = 0.0
+        if scale_ == 1:
+            for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(height):
+                    r = &rgb_array[i, j, 0]
+                    g = &rgb_array[i, j, 1]
+                    b = &rgb_array[i, j, 2]
+                    gray_value = (r[0] + g[0] + b[0]) / 3.0
+                    if gray_value > 0:
+                        mask[i, j] = 1.0
+                    else:
+                        mask[i, j] = 0.0
+        else:
+            for i in prange(mask_width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(mask_height):
+                    # Sum of the block scale_ x scale_
+                    gray_value = 0.0
+                    for ii in range(i * scale_, min((i + 1) * scale_, width)):
+                        for jj in range(j * scale_, min((j + 1) * scale_, height)):
+                            gray_value = gray_value + \
+                                rgb_array[ii, jj, 0] + rgb_array[ii, jj, 1] + rgb_array[ii, jj, 2]
+                    if gray_value > 0:
+                        mask[i, j] = 1.0
+                    else:
+                        mask[i, j] = 0.0
     return asarray(mask)
 
 
@@ -471,7 +818,7 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_bw_c(surface_):
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
-cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_):
+cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_, int scale_):
     """
     BUILD A MASK FROM A SURFACE (ALPHA)
 
@@ -482,13 +829,16 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_):
     * This function return a mask (array) shape (w, h) of normalized values, alpha channel values /255.0
 
     :param surface_: pygame.Surface compatible 32 bit only with alpha channel  
+    :param scale_  : integer; reduction factor (per axis) of the mask
     :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0] corresponding 
     to the channel alpha values / 255.0
     """
 
     cdef:
-        int width, height
+        int width, height, mask_width, mask_height
     width, height = surface_.get_size()
+    mask_width  = (width + scale_ - 1) // scale_
+    mask_height = (height + scale_ - 1) // scale_
 
     try:
         alpha_array = pixels_alpha(surface_)
@@ -497,8 +847,9 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_):
 
     cdef:
         unsigned char [:, :] alpha = alpha_array
-        float [:, :] mask = zeros((width, height), float32)
-        int i, j
+        float [:, :] mask = zeros((mask_width, mask_height), float32)
+        float alpha_value = 0.0
+        int i, j, ii, jj, count
 
     try:
         rgb_array = pixels3d(surface_)
@@ -506,13 +857,174 @@ cdef inline np.ndarray[np.float32_t, ndim=2] build_mask2d_alpha_c(surface_):
         raise ValueError("\nSurface cannot be referenced.\n%s " % e)
 
     with nogil:
-        for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
-            for j in range(height):
-                mask[i, j] = alpha[i, j] * ONE_255
+        if scale_ == 1:
+            for i in prange(width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(height):
+                    mask[i, j] = alpha[i, j] * ONE_255
+        else:
+            for i in prange(mask_width, schedule=SCHEDULE, num_threads=THREADS):
+                for j in range(mask_height):
+                    # Average of the block scale_ x scale_
+                    alpha_value = 0.0
+                    count = 0
+                    for ii in range(i * scale_, min((i + 1) * scale_, width)):
+                        for jj in range(j * scale_, min((j + 1) * scale_, height)):
+                            alpha_value = alpha_value + alpha[ii, jj]
+                            count = count + 1
+                    mask[i, j] = <float>(alpha_value / count * ONE_255)
     return asarray(mask)
 
 
+@cython.cdivision(True)
+cdef inline int mask_scale_c(int width, int height, int mask_width, int mask_height) nogil:
+    """
+    RETURN THE REDUCTION FACTOR OF A MASK 
+    
+    A mask is compatible with an image size (width, height) when its size is 
+    (ceil(width / scale), ceil(height / scale)) for an integer scale >= 1 (the same 
+    factor is used for both axis), see build_mask2d_* methods with argument scale_.
+    Several factors can give the same mask size (e.g. a 10x10 image and a 2x2 mask 
+    for any scale in range [5 ... 9]), the smallest one is returned.
+    
+    :param width      : integer; width of the image 
+    :param height     : integer; height of the image
+    :param mask_width : integer; width of the mask 
+    :param mask_height: integer; height of the mask
+    :return           : integer; the reduction factor (1 for a full resolution mask) or 0 
+    if the mask is not compatible with the image
+    """
+    cdef int scale_, upper
+
+    if width <= 0 or height <= 0 or mask_width <= 0 or mask_height <= 0:
+        return 0
+
+    # ceil(n / scale) == m for scale in range [ceil(n / m) ... ceil(n / (m - 1)) - 1]
+    scale_ = max((width + mask_width - 1) // mask_width, (height + mask_height - 1) // mask_height)
+    upper = max(width, height)
+    if mask_width > 1:
+        upper = min(upper, (width + mask_width - 2) // (mask_width - 1) - 1)
+    if mask_height > 1:
+        upper = min(upper, (height + mask_height - 2) // (mask_height - 1) - 1)
+
+    if scale_ < 1 or scale_ > upper:
+        return 0
+
+    return scale_
+
+
+cdef inline int block_scale_c(int width, int height, int scale_) nogil:
+    """
+    RETURN THE BLOCK SIZE OF A REDUCED MASK BUILT WITH THE FACTOR scale_
+    
+    The saturation methods sample a mask with the factor returned by mask_scale_c for 
+    the mask size, smaller than scale_ when several factors give the same size (e.g. 
+    17x17 image and scale_=8 -> mask 3x3 sampled with blocks 6x6). The mask is built 
+    with the same blocks.
+    
+    :param width : integer; width of the image 
+    :param height: integer; height of the image
+    :param scale_: integer; reduction factor requested (>= 1)
+    :return      : integer; block size in range [1 ... scale_]
+    """
+    cdef int block = mask_scale_c(
+        width, height, (width + scale_ - 1) // scale_, (height + scale_ - 1) // scale_)
+    return block if block > 0 else scale_
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef inline float mask_value_c(
+        float [:, :] mask_array,
+        int i,
+        int j,
+        int mask_scale,
+        bint bilinear_
+) nogil:
+    """
+    RETURN THE MASK VALUE OF THE PIXEL (i, j)
+    
+    The mask can be stored at a reduced resolution (1 / mask_scale per axis), in that 
+    case the value is sampled on the fly with a nearest-neighbor or bilinear filter.
+    
+    :param mask_array: float numpy.ndarray shape (mask_width, mask_height) 
+    :param i         : integer; pixel x coordinate in the image 
+    :param j         : integer; pixel y coordinate in the image
+    :param mask_scale: integer; reduction factor of the mask (1 full resolution)
+    :param bilinear_ : bool; True bilinear filtering, False nearest-neighbor
+    :return          : float; mask value for the pixel (i, j)
+    """
+    cdef:
+        int x0, y0, x1, y1
+        float fx, fy, dx, dy
+
+    if mask_scale == 1:
+        return mask_array[i, j]
+
+    if not bilinear_:
+        return mask_array[i // mask_scale, j // mask_scale]
+
+    # pixel centre expressed in mask coordinates
+    fx = max((i + <float>0.5) / mask_scale - <float>0.5, <float>0.0)
+    fy = max((j + <float>0.5) / mask_scale - <float>0.5, <float>0.0)
+    x0 = <int>fx
+    y0 = <int>fy
+    x1 = min(x0 + 1, <int>mask_array.shape[0] - 1)
+    y1 = min(y0 + 1, <int>mask_array.shape[1] - 1)
+    dx = fx - x0
+    dy = fy - y0
+
+    return (mask_array[x0, y0] * (<float>1.0 - dx) + mask_array[x1, y0] * dx) * (<float>1.0 - dy) + \
+           (mask_array[x0, y1] * (<float>1.0 - dx) + mask_array[x1, y1] * dx) * dy
+
+
+cdef void srgb_tables_c():
+    """
+    FILL THE sRGB TRANSFER FUNCTION LOOKUP TABLES (CALLED ONCE WHEN THE MODULE IS IMPORTED)
+    
+    :return: void
+    """
+    cdef:
+        int n
+        double v
+
+    for n in range(256):
+        v = n * ONE_255
+        srgb_to_linear[n] = <float>(v / 12.92 if v <= 0.04045 else pow((v + 0.055) / 1.055, 2.4))
+
+    for n in range(LINEAR_LEVELS):
+        v = <double>n / (LINEAR_LEVELS - 1)
+        v = v * 12.92 if v <= 0.0031308 else 1.055 * pow(v, 1.0 / 2.4) - 0.055
+        linear_to_srgb[n] = <unsigned char>(v * 255.0 + HALF)
+
+srgb_tables_c()
+
+
+cdef inline double srgb_decode_c(unsigned char value, bint linear_) nogil:
+    """
+    CONVERT A PIXEL VALUE INTO A NORMALIZED VALUE [0.0 ... 1.0]
+    
+    :param value  : unsigned char; pixel value (sRGB)
+    :param linear_: bool; True decode the value into linear light (table lookup)
+    :return       : normalized value
+    """
+    if linear_:
+        return srgb_to_linear[value]
+    return <float>value * ONE_255
+
 
+cdef inline unsigned char srgb_encode_c(double value, bint linear_) nogil:
+    """
+    CONVERT A NORMALIZED VALUE [0.0 ... 1.0] INTO A PIXEL VALUE (INVERSE OF srgb_decode_c)
+    
+    :param value  : double; normalized value
+    :param linear_: bool; True encode the linear light value into sRGB (table lookup)
+    :return       : pixel value
+    """
+    if linear_:
+        return linear_to_srgb[<int>(min(max(value, 0.0), 1.0) * (LINEAR_LEVELS - 1) + HALF)]
+    return <unsigned char>(value * 255.0)
 
 
 @cython.boundscheck(False)
@@ -525,6 +1037,9 @@ cdef inline object saturation_array24_mask_c(
         float [:, :] mask_array,
         int width,
         int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         ):
     """
     CHANGE THE SATURATION LEVEL  
@@ -551,6 +1066,7 @@ cdef inline object saturation_array24_mask_c(
     a layer to cover the pixels that will not be affected by the saturation effect 
     :param width          : integer; width of the image
     :param height         : integer; height of the image
+    :param linear_        : bool; True the saturation is changed in linear light (sRGB decoded)
     :return               : Return a pygame.Surface 24-32 bit without per-pixel information 
 
     """
@@ -560,7 +1076,7 @@ cdef inline object saturation_array24_mask_c(
         unsigned char *r
         unsigned char *g
         unsigned char *b
-        float *m
+        float m
         float s
         hsl hsl_
         rgb rgb_
@@ -577,17 +1093,18 @@ cdef inline object saturation_array24_mask_c(
                     r = &rgb_array_[i, j, 0]
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
-                    m = &mask_array[i, j]
-                    if m[0] > 0:
+                    m = mask_value_c(mask_array, i, j, mask_scale, bilinear_)
+                    if m > 0:
 
-                        hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                        hsl_ = struct_rgb_to_hsl(
+                            srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                         s = min((hsl_.s + shift_), 1.0)
                         s = max(s, 0.0)
                         rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                        rgb_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0 * m[0])
-                        rgb_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0 * m[0])
-                        rgb_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0 * m[0])
+                        rgb_array[j, i, 0] = srgb_encode_c(rgb_.r * m, linear_)
+                        rgb_array[j, i, 1] = srgb_encode_c(rgb_.g * m, linear_)
+                        rgb_array[j, i, 2] = srgb_encode_c(rgb_.b * m, linear_)
                     else:
                         rgb_array[j, i, 0] = r[0]
                         rgb_array[j, i, 1] = g[0]
@@ -602,14 +1119,15 @@ cdef inline object saturation_array24_mask_c(
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
 
-                    hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                    hsl_ = struct_rgb_to_hsl(
+                        srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                     s = min((hsl_.s + shift_), 1.0)
                     s = max(s, 0.0)
                     rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                    rgb_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0)
-                    rgb_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0)
-                    rgb_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0)
+                    rgb_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                    rgb_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                    rgb_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
 
     return pygame.image.frombuffer(rgb_array, (width, height), 'RGB')
 
@@ -625,6 +1143,9 @@ cdef inline object saturation_array24_mask_c1(
         float [:, :] mask_array,
         int width,
         int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         ):
     """
     CHANGE THE SATURATION LEVEL  
@@ -651,6 +1172,7 @@ cdef inline object saturation_array24_mask_c1(
     a layer to cover the pixels that will not be affected by the saturation effect 
     :param width          : integer; width of the image
     :param height         : integer; height of the image
+    :param linear_        : bool; True the saturation is changed in linear light (sRGB decoded)
     :return               : Return a pygame.Surface 24-32 bit without per-pixel information 
 
     """
@@ -665,7 +1187,7 @@ cdef inline object saturation_array24_mask_c1(
         unsigned char *r
         unsigned char *g
         unsigned char *b
-        float *m
+        float m
         float s
         hsl hsl_
         rgb rgb_
@@ -682,17 +1204,18 @@ cdef inline object saturation_array24_mask_c1(
                     r = &rgb_array_[i, j, 0]
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
-                    m = &mask_array[i, j]
-                    if m[0] > 0:
+                    m = mask_value_c(mask_array, i, j, mask_scale, bilinear_)
+                    if m > 0:
 
-                        hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                        hsl_ = struct_rgb_to_hsl(
+                            srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                         s = min((hsl_.s + shift_), 1.0)
                         s = max(s, 0.0)
                         rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                        rgb_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0 * m[0])
-                        rgb_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0 * m[0])
-                        rgb_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0 * m[0])
+                        rgb_array[j, i, 0] = srgb_encode_c(rgb_.r * m, linear_)
+                        rgb_array[j, i, 1] = srgb_encode_c(rgb_.g * m, linear_)
+                        rgb_array[j, i, 2] = srgb_encode_c(rgb_.b * m, linear_)
                     else:
                         rgb_array[j, i, 0] = r[0]
                         rgb_array[j, i, 1] = g[0]
@@ -707,14 +1230,15 @@ cdef inline object saturation_array24_mask_c1(
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
 
-                    hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                    hsl_ = struct_rgb_to_hsl(
+                        srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                     s = min((hsl_.s + shift_), 1.0)
                     s = max(s, 0.0)
                     rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                    rgb_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0)
-                    rgb_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0)
-                    rgb_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0)
+                    rgb_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                    rgb_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                    rgb_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
 
     return pygame.image.frombuffer(rgb_array, (width, height), 'RGB')
 
@@ -729,7 +1253,10 @@ cdef inline object saturation_array32_mask_c1(
         float shift_,
         float [:, :] mask_array,
         int width,
-        int height
+        int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         ):
     """
 
@@ -758,6 +1285,7 @@ cdef inline object saturation_array32_mask_c1(
     :param mask_array: float numpy.ndarray shape (width, height) 
     :param width     : integer; width of the image
     :param height    : integer; height of the image
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB decoded)
     :return: a pygame.Surface 32-bit with per-pixel information 
     """
 
@@ -767,7 +1295,7 @@ cdef inline object saturation_array32_mask_c1(
         unsigned char *r
         unsigned char *g
         unsigned char *b
-        float *m
+        float m
         float s
         hsl hsl_
         rgb rgb_
@@ -784,19 +1312,20 @@ cdef inline object saturation_array32_mask_c1(
                     r = &rgb_array_[i, j, 0]
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
-                    m = &mask_array[i, j]
+                    m = mask_value_c(mask_array, i, j, mask_scale, bilinear_)
 
-                    if m[0] > 0:
+                    if m > 0:
 
                         # # change saturation
-                        hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                        hsl_ = struct_rgb_to_hsl(
+                            srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                         s = hsl_.s
                         s = min((s + shift_), 1.0)
                         s = max(s, 0.0)
                         rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                        new_array[j, i, 0] = <unsigned char>(rgb_.r * 255.0 * m[0])
-                        new_array[j, i, 1] = <unsigned char>(rgb_.g * 255.0 * m[0])
-                        new_array[j, i, 2] = <unsigned char>(rgb_.b * 255.0 * m[0])
+                        new_array[j, i, 0] = srgb_encode_c(rgb_.r * m, linear_)
+                        new_array[j, i, 1] = srgb_encode_c(rgb_.g * m, linear_)
+                        new_array[j, i, 2] = srgb_encode_c(rgb_.b * m, linear_)
                     else:
                         new_array[j, i, 0] = r[0]
                         new_array[j, i, 1] = g[0]
@@ -814,14 +1343,15 @@ cdef inline object saturation_array32_mask_c1(
                     b = &rgb_array_[i, j, 2]
 
                     # # change saturation
-                    hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                    hsl_ = struct_rgb_to_hsl(
+                        srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                     s = hsl_.s
                     s = min((s + shift_), 1.0)
                     s = max(s, 0.0)
                     rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                    new_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0)
-                    new_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0)
-                    new_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0)
+                    new_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                    new_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                    new_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
                     new_array[j, i, 3] = alpha_array_[i, j]
 
     return pygame.image.frombuffer(new_array, (width, height), 'RGBA')
@@ -837,7 +1367,10 @@ cdef inline object saturation_array32_mask_c(
         float shift_,
         float [:, :] mask_array,
         int width,
-        int height
+        int height,
+        int mask_scale,
+        bint bilinear_,
+        bint linear_
         ):
     """
     
@@ -864,6 +1397,7 @@ cdef inline object saturation_array32_mask_c(
     :param mask_array: float numpy.ndarray shape (width, height) 
     :param width     : integer; width of the image
     :param height    : integer; height of the image
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB decoded)
     :return: a pygame.Surface 32-bit with per-pixel information 
     """
 
@@ -886,7 +1420,7 @@ cdef inline object saturation_array32_mask_c(
         unsigned char *r
         unsigned char *g
         unsigned char *b
-        float *m
+        float m
         float s
         hsl hsl_
         rgb rgb_
@@ -903,19 +1437,20 @@ cdef inline object saturation_array32_mask_c(
                     r = &rgb_array_[i, j, 0]
                     g = &rgb_array_[i, j, 1]
                     b = &rgb_array_[i, j, 2]
-                    m = &mask_array[i, j]
+                    m = mask_value_c(mask_array, i, j, mask_scale, bilinear_)
 
-                    if m[0] > 0:
+                    if m > 0:
 
                         # # change saturation
-                        hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                        hsl_ = struct_rgb_to_hsl(
+                            srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                         s = hsl_.s
                         s = min((s + shift_), 1.0)
                         s = max(s, 0.0)
                         rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                        new_array[j, i, 0] = <unsigned char>(rgb_.r * 255.0 * m[0])
-                        new_array[j, i, 1] = <unsigned char>(rgb_.g * 255.0 * m[0])
-                        new_array[j, i, 2] = <unsigned char>(rgb_.b * 255.0 * m[0])
+                        new_array[j, i, 0] = srgb_encode_c(rgb_.r * m, linear_)
+                        new_array[j, i, 1] = srgb_encode_c(rgb_.g * m, linear_)
+                        new_array[j, i, 2] = srgb_encode_c(rgb_.b * m, linear_)
                     else:
                         new_array[j, i, 0] = r[0]
                         new_array[j, i, 1] = g[0]
@@ -933,14 +1468,15 @@ cdef inline object saturation_array32_mask_c(
                     b = &rgb_array_[i, j, 2]
 
                     # # change saturation
-                    hsl_ = struct_rgb_to_hsl(r[0] * ONE_255, g[0] * ONE_255, b[0] * ONE_255)
+                    hsl_ = struct_rgb_to_hsl(
+                        srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                     s = hsl_.s
                     s = min((s + shift_), 1.0)
                     s = max(s, 0.0)
                     rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                    new_array[j, i, 0] = <unsigned char> (rgb_.r * 255.0)
-                    new_array[j, i, 1] = <unsigned char> (rgb_.g * 255.0)
-                    new_array[j, i, 2] = <unsigned char> (rgb_.b * 255.0)
+                    new_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                    new_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                    new_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
                     new_array[j, i, 3] = alpha_array_[i, j]
 
     return pygame.image.frombuffer(new_array, (width, height), 'RGBA')
@@ -955,7 +1491,8 @@ cdef inline object saturation_array24_c(
         unsigned char [:, :, :] array_,
         float shift_,
         int width,
-        int height
+        int height,
+        bint linear_
 ):
 
     """
@@ -977,6 +1514,7 @@ cdef inline object saturation_array24_c(
     :param shift_: Value must be in range [-1.0 ... 1.0], negative values decrease saturation
     :param width : integer; width of the image 
     :param height: integer; height of the image
+    :param linear_: bool; True the saturation is changed in linear light (sRGB decoded)
     :return: Return a pygame.Surface 24-bit without per-pixel information 
     """
 
@@ -999,14 +1537,15 @@ cdef inline object saturation_array24_c(
                 g = &array_[i, j, 1]
                 b = &array_[i, j, 2]
 
-                hsl_ = struct_rgb_to_hsl(<float>r[0] * ONE_255, <float>g[0] * ONE_255, <float>b[0] * ONE_255)
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
                 s = min((hsl_.s + shift_), 0.5)
                 s = max(s, 0.0)
                 rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                new_array[j, i, 0] = <unsigned char>(rgb_.r * 255.0)
-                new_array[j, i, 1] = <unsigned char>(rgb_.g * 255.0)
-                new_array[j, i, 2] = <unsigned char>(rgb_.b * 255.0)
+                new_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                new_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                new_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
 
     return pygame.image.frombuffer(new_array, (width, height), 'RGB')
 
@@ -1022,7 +1561,8 @@ cdef inline object saturation_array32_c(
         unsigned char [:, :] alpha_,
         float shift_,
         int width,
-        int height
+        int height,
+        bint linear_
 ):
     """
     CHANGE THE SATURATION LEVEL 
@@ -1041,6 +1581,7 @@ cdef inline object saturation_array32_c(
     :param shift_: Value must be in range [-1.0 ... 1.0], negative values decrease saturation  
     :param width : integer; width of the surface 
     :param height: integer; height of the surface
+    :param linear_: bool; True the saturation is changed in linear light (sRGB decoded)
     :return: a pygame.Surface 32-bit with per-pixel information 
     """
 
@@ -1048,7 +1589,7 @@ cdef inline object saturation_array32_c(
         unsigned char [:, :, :] new_array = empty((height, width, 4), dtype=uint8)
         int i=0, j=0
         float s
-        float r, g, b
+        unsigned char r, g, b
         hsl hsl_
         rgb rgb_
 
@@ -1059,112 +1600,375 @@ cdef inline object saturation_array32_c(
 
                 # Load RGB
                 r, g, b = array_[i, j, 0], array_[i, j, 1], array_[i, j, 2]
-                hsl_ = struct_rgb_to_hsl(r * ONE_255, g * ONE_255, b * ONE_255)
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(r, linear_), srgb_decode_c(g, linear_), srgb_decode_c(b, linear_))
                 s = hsl_.s
                 s = min((s + shift_), 1.0)
                 s = max(s, 0.0)
                 rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                new_array[j, i, 0] = <unsigned char>(rgb_.r * 255.0)
-                new_array[j, i, 1] = <unsigned char>(rgb_.g * 255.0)
-                new_array[j, i, 2] = <unsigned char>(rgb_.b * 255.0)
+                new_array[j, i, 0] = srgb_encode_c(rgb_.r, linear_)
+                new_array[j, i, 1] = srgb_encode_c(rgb_.g, linear_)
+                new_array[j, i, 2] = srgb_encode_c(rgb_.b, linear_)
                 new_array[j, i, 3] = alpha_[i, j]
 
     return pygame.image.frombuffer(new_array, (width, height), 'RGBA')
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef inline void saturation_levels_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        float [::1] shifts_,
+        list outputs_,
+        int width,
+        int height,
+        bint linear_
+) except *:
+    """
+    CHANGE THE SATURATION LEVEL OF AN IMAGE FOR SEVERAL SHIFT VALUES (SINGLE PASS)
+    
+    Each pixel is converted to HSL once, the saturation shift and the conversion back 
+    to RGB are done for every shift value. The maximum saturation is 0.5 without 
+    alpha channel and 1.0 with alpha channel (same as saturation_array24_c and 
+    saturation_array32_c).
+    
+    :param array_  : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param alpha_  : numpy.ndarray (w, h) uint8 alpha values or None 
+    :param shifts_ : 1d array float32 of shift values in range [-1.0 ... 1.0]
+    :param outputs_: list of numpy.ndarray (h, w, 3) uint8 or (h, w, 4) with alpha 
+    channel (C contiguous), one per shift value 
+    :param width   : integer; width of the image
+    :param height  : integer; height of the image
+    :param linear_ : bool; True the saturation is changed in linear light (sRGB decoded)
+    :return        : void
+    """
+
+    cdef:
+        int levels = <int>len(shifts_)
+        bint with_alpha = alpha_ is not None
+        int bytesize = 4 if with_alpha else 3
+        float smax = 1.0 if with_alpha else 0.5
+        unsigned char ** outputs = <unsigned char **>malloc(levels * sizeof(unsigned char *))
+        unsigned char [:, :, ::1] output
+        unsigned char *p
+        int i=0, j=0, k=0, index
+        float s
+        hsl hsl_
+        rgb rgb_
+
+    if outputs == NULL:
+        raise MemoryError("\nCannot allocate memory for %s saturation levels." % levels)
+
+    for k in range(levels):
+        output = outputs_[k]
+        outputs[k] = &output[0, 0, 0]
+
+    with nogil:
+        for j in prange(height, schedule=SCHEDULE, num_threads=THREADS):
+            for i in range(width):
+
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(array_[i, j, 0], linear_),
+                    srgb_decode_c(array_[i, j, 1], linear_),
+                    srgb_decode_c(array_[i, j, 2], linear_))
+                index = (j * width + i) * bytesize
+
+                for k in range(levels):
+                    s = min((hsl_.s + shifts_[k]), smax)
+                    s = max(s, 0.0)
+                    rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
+
+                    p = outputs[k] + index
+                    p[0] = srgb_encode_c(rgb_.r, linear_)
+                    p[1] = srgb_encode_c(rgb_.g, linear_)
+                    p[2] = srgb_encode_c(rgb_.b, linear_)
+                    if with_alpha:
+                        p[3] = alpha_[i, j]
+
+    free(outputs)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef inline double saturation_histogram_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        long long [:, ::1] histograms_,
+        int width,
+        int height
+):
+    """
+    SATURATION HISTOGRAM (PARALLEL REDUCTION)
+    
+    Each thread fills its own row of <histograms_> (indexed with threadid) and the 
+    sum of the saturation values is an OpenMP reduction, no temporary array is created.
+    Pixels with an alpha value of 0 are ignored when alpha_ is not None.
+    
+    :param array_     : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels 
+    :param alpha_     : numpy.ndarray (w, h) uint8 alpha values or None 
+    :param histograms_: numpy.ndarray (THREADS, bins) int64 filled with zeros
+    :param width      : integer; width of the image
+    :param height     : integer; height of the image
+    :return           : sum of the saturation values (double)
+    """
+
+    cdef:
+        bint with_alpha = alpha_ is not None
+        int bins = <int>histograms_.shape[1]
+        int i=0, j=0, k
+        double total = 0.0
+        hsl hsl_
+
+    with nogil:
+        for j in prange(height, schedule=SCHEDULE, num_threads=THREADS):
+            for i in range(width):
+
+                if with_alpha and alpha_[i, j] == 0:
+                    continue
+
+                hsl_ = struct_rgb_to_hsl(
+                    <float>array_[i, j, 0] * ONE_255,
+                    <float>array_[i, j, 1] * ONE_255,
+                    <float>array_[i, j, 2] * ONE_255)
+
+                k = <int>(hsl_.s * bins)
+                k = max(min(k, bins - 1), 0)
+                histograms_[threadid(), k] += 1
+                total += hsl_.s
+
+    return total
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef inline float auto_shift_c(long long [::1] histogram_, float target_mean, float smax):
+    """
+    SHIFT VALUE GIVING A MEAN SATURATION OF <target_mean>
+    
+    The mean saturation after a shift (values clipped to [0.0 ... smax]) is evaluated 
+    on the histogram bins (centre of the bin), the shift is found by bisection 
+    (the mean is increasing with the shift).
+    
+    :param histogram_ : numpy.ndarray (bins,) int64 saturation histogram
+    :param target_mean: float; mean saturation wanted
+    :param smax       : float; maximum saturation of the kernel (0.5 for 24-bit, 1.0 for 32-bit)
+    :return           : shift value in range [-1.0 ... 1.0]
+    """
+
+    cdef:
+        int bins = <int>histogram_.shape[0]
+        int k, n
+        long long count = 0
+        double low = -1.0, high = 1.0, shift = 0.0, s, total
+
+    for k in range(bins):
+        count = count + histogram_[k]
+    if count == 0:
+        return 0.0
+
+    with nogil:
+        for n in range(32):
+            shift = (low + high) * HALF
+            total = 0.0
+            for k in range(bins):
+                if histogram_[k] == 0:
+                    continue
+                s = (k + HALF) / bins + shift
+                s = max(min(s, smax), 0.0)
+                total = total + s * histogram_[k]
+            if total / count < target_mean:
+                low = shift
+            else:
+                high = shift
+
+    return <float>shift
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef inline object saturation_array_subsample_c(
+        unsigned char [:, :, :] array_,
+        unsigned char [:, :] alpha_,
+        float shift_,
+        int width,
+        int height,
+        int subsample_,
+        float smax_
+):
+    """
+    CHANGE SATURATION LEVEL (APPROXIMATION, SATURATION GAIN COMPUTED PER BLOCK)
+    
+    INPUT 
+    ______
+    numpy.ndarray shape (w, h, 3) uint8 values 
+    numpy.ndarray shape (w, h) uint8 alpha values or None 
+    
+    OUTPUT 
+    ------
+    Pygame.Surface size (w, h) 24-bit format without alpha channel (RGB format) or 
+    32-bit format with alpha channel (RGBA format) when alpha_ is not None
+    
+    With hue and lightness unchanged, the HSL to RGB conversion is linear with the 
+    saturation, each channel c becomes l + (c - l) * s' / s (l = (max + min) / 2). 
+    The gain s' / s is computed once per block subsample_ x subsample_ (HSL conversion 
+    of the block average colour, similar to a chroma subsampling 4:2:0) and applied 
+    to each pixel of the block with the linear operation above. 
+    The result is exact for blocks with a uniform saturation, the error increases 
+    with the saturation variance inside the blocks.
+    
+    :param array_    : numpy.ndarray (w, h, 3) uint8 representing a 24-32 bit surface
+    :param alpha_    : numpy.ndarray (w, h) uint8 alpha values or None 
+    :param shift_    : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param width     : integer; width of the image 
+    :param height    : integer; height of the image
+    :param subsample_: integer; block size >= 1 (e.g 2 for blocks 2x2, 4 for blocks 4x4)
+    :param smax_     : float; maximum saturation value after the shift
+    :return: Return a pygame.Surface 24-bit or 32-bit (alpha_ not None)
+    """
+
+    cdef:
+        int block_width  = (width + subsample_ - 1) // subsample_
+        int block_height = (height + subsample_ - 1) // subsample_
+        bint with_alpha = alpha_ is not None
+        int bytesize = 4 if with_alpha else 3
+        unsigned char [:, :, ::1] new_array = empty((height, width, bytesize), dtype=uint8)
+        int bi=0, bj=0, i=0, j=0, i1, j1, count
+        float r, g, b, l, s, gain
+        float mr, mg, mb
+        hsl hsl_
+
+    with nogil:
+        for bj in prange(block_height, schedule=SCHEDULE, num_threads=THREADS):
+            j1 = min((bj + 1) * subsample_, height)
+            for bi in range(block_width):
+                i1 = min((bi + 1) * subsample_, width)
+
+                # Average colour of the block
+                mr = 0.0
+                mg = 0.0
+                mb = 0.0
+                count = 0
+                for j in range(bj * subsample_, j1):
+                    for i in range(bi * subsample_, i1):
+                        mr = mr + array_[i, j, 0]
+                        mg = mg + array_[i, j, 1]
+                        mb = mb + array_[i, j, 2]
+                        count = count + 1
+
+                # Saturation gain of the block
+                hsl_ = struct_rgb_to_hsl(
+                    mr / count * ONE_255, mg / count * ONE_255, mb / count * ONE_255)
+                s = min((hsl_.s + shift_), smax_)
+                s = max(s, 0.0)
+                if hsl_.s > 0.0:
+                    gain = <float>(s / hsl_.s)
+                else:
+                    gain = 1.0
+
+                # Apply the gain to each pixel (lightness unchanged)
+                for j in range(bj * subsample_, j1):
+                    for i in range(bi * subsample_, i1):
+                        r = array_[i, j, 0]
+                        g = array_[i, j, 1]
+                        b = array_[i, j, 2]
+                        l = <float>((max(r, g, b) + min(r, g, b)) * HALF)
+                        new_array[j, i, 0] = <unsigned char>min(max(l + (r - l) * gain, <float>0.0), <float>255.0)
+                        new_array[j, i, 1] = <unsigned char>min(max(l + (g - l) * gain, <float>0.0), <float>255.0)
+                        new_array[j, i, 2] = <unsigned char>min(max(l + (b - l) * gain, <float>0.0), <float>255.0)
+                        if with_alpha:
+                            new_array[j, i, 3] = alpha_[i, j]
+
+    return pygame.image.frombuffer(new_array, (width, height), 'RGBA' if with_alpha else 'RGB')
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
 cdef saturation_buffer_mask_c(
-        unsigned char [::1] buffer_,
+        const unsigned char [::1] buffer_,
         float shift_,
         float [::1] mask_array,
         int width,
-        int height
+        int height,
+        pixel_format format_c,
+        bint linear_
 ):
     """
     CHANGE THE SATURATION LEVEL OF ALL SELECTED PIXELS FROM A BUFFER.
     
     Transform RGB model into HSL model and <shift_> values.
-    mask_array argument cannot be null. The mask should be a buffer type (1d array)
-    (filled with normalized float values in range[0.0 ... 1.0]).
+    mask_array argument is optional, the mask should be a buffer type (1d array)
+    (filled with normalized float values in range[0.0 ... 1.0]), pixels with a 
+    mask value <= 0.0 are copied unchanged.
     
 
-    :param buffer_: 1d Buffer representing a 24bit format pygame.Surface
+    :param buffer_: 1d Buffer (unsigned char) referencing the pixels 
     :param shift_ : Value must be in range [-1.0 ... 1.0],
                    between [-1.0 ... 0.0] decrease saturation.
                    between [0.0  ... 1.0] increase saturation.
-    :param mask_array: 1d Buffer mask_array ; must be equal to the buffer length
+    :param mask_array: 1d Buffer mask_array ; must be equal to width * height or None
     :param width  : integer; width of the image
     :param height : integer; height of the image
-    :return: a pygame.Surface 24-bit without per-pixel information
+    :param format_c: pixel_format structure (channel offsets, bytes per pixel, row pitch)
+    :param linear_ : bool; True the saturation is changed in linear light (sRGB decoded)
+    :return: a pygame.Surface 24-bit without per-pixel information (RGB) or 32-bit with 
+    per-pixel information (RGBA) if the pixel format has an alpha channel 
     """
 
-    assert isinstance(shift_, float), \
-           'Expecting float for argument shift_, got %s ' % type(shift_)
-    assert -1.0 <= shift_ <= 1.0, 'Argument shift_ must be in range [-1.0 .. 1.0].'
-
-    cdef int b_length, m_length
-
-    try:
-        b_length = len(<object>buffer_)
-    except ValueError:
-        raise ValueError("\nIncompatible buffer type got %s." % type(buffer_))
-
-    if mask_array is not None:
-        try:
-            m_length = len(<object>mask_array)
-        except (ValueError, pygame.error) as e:
-            raise ValueError("\nIncompatible buffer type got %s." % type(buffer_))
-    else:
-        raise ValueError("\nIncompatible buffer type got %s ." % type(buffer_))
-
-
-    if m_length != (b_length // 3):
-        raise ValueError(
-            "\nMask length and buffer length mismatch, %s %s" % (b_length, m_length))
-
     cdef:
-        int ii=0
-        unsigned char [::1] new_array = empty(b_length, dtype=uint8)
-        unsigned char *r
-        unsigned char *g
-        unsigned char *b
-        unsigned char *nr
-        unsigned char *ng
-        unsigned char *nb
+        int i=0, j=0, index, out
+        int bytesize = 4 if format_c.a >= 0 else 3
+        bint masked = mask_array is not None
+        unsigned char [::1] new_array = empty(width * height * bytesize, dtype=uint8)
+        unsigned char r, g, b
         float s
         hsl hsl_
         rgb rgb_
 
     with nogil:
 
-        for ii in prange(0, b_length, 3, schedule=SCHEDULE, num_threads=THREADS):
-            # load pixel RGB values
-            r = &buffer_[ii    ]
-            g = &buffer_[ii + 1]
-            b = &buffer_[ii + 2]
-            nr = &new_array[ii]
-            ng = &new_array[ii + 1]
-            nb = &new_array[ii + 2]
+        for j in prange(height, schedule=SCHEDULE, num_threads=THREADS):
+            for i in range(width):
+                # load pixel RGB values
+                index = j * format_c.pitch + i * format_c.bytesize
+                out = (j * width + i) * bytesize
+                r = buffer_[index + format_c.r]
+                g = buffer_[index + format_c.g]
+                b = buffer_[index + format_c.b]
+
+                if masked and mask_array[j * width + i] <= 0.0:
+                    new_array[out    ] = r
+                    new_array[out + 1] = g
+                    new_array[out + 2] = b
 
-            if mask_array[ii // 3] > 0.0:
+                else:
+                    hsl_ = struct_rgb_to_hsl(
+                        srgb_decode_c(r, linear_), srgb_decode_c(g, linear_), srgb_decode_c(b, linear_))
 
-                hsl_ = struct_rgb_to_hsl(<float>r[0] * ONE_255, <float>g[0] * ONE_255, <float>b[0] * ONE_255)
+                    s = hsl_.s
+                    s = min((s + shift_), 1.0)
+                    s = max(s, 0.0)
 
-                s = hsl_.s
-                s = min((s + shift_), 1.0)
-                s = max(s, 0.0)
+                    rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-                rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
+                    new_array[out    ] = srgb_encode_c(rgb_.r, linear_)
+                    new_array[out + 1] = srgb_encode_c(rgb_.g, linear_)
+                    new_array[out + 2] = srgb_encode_c(rgb_.b, linear_)
 
-            nr[0] = <unsigned char>(rgb_.r * 255.0)
-            ng[0] = <unsigned char>(rgb_.g * 255.0)
-            nb[0] = <unsigned char>(rgb_.b * 255.0)
+                if bytesize == 4:
+                    new_array[out + 3] = buffer_[index + format_c.a]
 
-    # return pygame.image.fromstring(bytes(new_array), (width, height), "RGB", False)
-    return pygame.image.frombuffer(new_array, (width, height), 'RGB')
+    return pygame.image.frombuffer(new_array, (width, height), 'RGBA' if bytesize == 4 else 'RGB')
 
 
 @cython.boundscheck(False)
@@ -1176,52 +1980,35 @@ cdef inline void saturation_buffer_mask_inplace_c(
         float shift_,
         float [::1] mask_array,
         int width,
-        int height
+        int height,
+        pixel_format format_c,
+        bint linear_
 ):
     """
-    CHANGE THE SATURATION LEVEL OF ALL SELECTED PIXELS FROM A BUFFER.
+    CHANGE THE SATURATION LEVEL OF ALL SELECTED PIXELS FROM A BUFFER (INPLACE).
 
     Transform RGB model into HSL model and <shift_> values.
-    mask_array argument cannot be null. The mask should be a buffer type (1d array)
-    (filled with normalized float values in range[0.0 ... 1.0]).
+    mask_array argument is optional, the mask should be a buffer type (1d array)
+    (filled with normalized float values in range[0.0 ... 1.0]), pixels with a 
+    mask value <= 0.0 are left unchanged.
+    The alpha channel and the row padding (if any) are never modified.
 
 
-    :param buffer_: 1d Buffer representing a 24bit format pygame.Surface
+    :param buffer_: 1d Buffer (unsigned char) referencing the pixels 
     :param shift_ : Value must be in range [-1.0 ... 1.0],
                    between [-1.0 ... 0.0] decrease saturation.
                    between [0.0  ... 1.0] increase saturation.
-    :param mask_array: 1d Buffer mask_array ; must be equal to the buffer length
+    :param mask_array: 1d Buffer mask_array ; must be equal to width * height or None
     :param width  : integer; width of the image
     :param height : integer; height of the image
-    :return: a pygame.Surface 24-bit without per-pixel information
+    :param format_c: pixel_format structure (channel offsets, bytes per pixel, row pitch)
+    :param linear_ : bool; True the saturation is changed in linear light (sRGB decoded)
+    :return: void
     """
 
-    assert isinstance(shift_, float), \
-           'Expecting float for argument shift_, got %s ' % type(shift_)
-    assert -1.0 <= shift_ <= 1.0, 'Argument shift_ must be in range [-1.0 .. 1.0].'
-
-    cdef int b_length, m_length
-
-    try:
-        b_length = len(<object>buffer_)
-    except ValueError:
-        raise ValueError("\nIncompatible buffer type got %s." % type(buffer_))
-
-    if mask_array is not None:
-        try:
-            m_length = len(<object>mask_array)
-        except (ValueError, pygame.error) as e:
-            raise ValueError("\nIncompatible buffer type got %s." % type(buffer_))
-    else:
-        raise ValueError("\nIncompatible buffer type got %s ." % type(buffer_))
-
-
-    if m_length != (b_length // 3):
-        raise ValueError(
-            "\nMask length and buffer length mismatch, %s %s" % (b_length, m_length))
-
     cdef:
-        int ii=0
+        int i=0, j=0, index
+        bint masked = mask_array is not None
         unsigned char *r
         unsigned char *g
         unsigned char *b
@@ -1231,16 +2018,20 @@ cdef inline void saturation_buffer_mask_inplace_c(
 
     with nogil:
 
-        for ii in prange(0, b_length, 3, schedule=SCHEDULE, num_threads=THREADS):
-            # load pixel RGB values
-            r = &buffer_[ii    ]
-            g = &buffer_[ii + 1]
-            b = &buffer_[ii + 2]
+        for j in prange(height, schedule=SCHEDULE, num_threads=THREADS):
+            for i in range(width):
 
+                if masked and mask_array[j * width + i] <= 0.0:
+                    continue
 
-            if mask_array[ii // 3] > 0.0:
+                # load pixel RGB values
+                index = j * format_c.pitch + i * format_c.bytesize
+                r = &buffer_[index + format_c.r]
+                g = &buffer_[index + format_c.g]
+                b = &buffer_[index + format_c.b]
 
-                hsl_ = struct_rgb_to_hsl(<float>r[0] * ONE_255, <float>g[0] * ONE_255, <float>b[0] * ONE_255)
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
 
                 s = hsl_.s
                 s = min((s + shift_), 1.0)
@@ -1248,10 +2039,9 @@ cdef inline void saturation_buffer_mask_inplace_c(
 
                 rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
 
-            r[0] = <unsigned char>(rgb_.r * 255.0)
-            g[0] = <unsigned char>(rgb_.g * 255.0)
-            b[0] = <unsigned char>(rgb_.b * 255.0)
-
+                r[0] = srgb_encode_c(rgb_.r, linear_)
+                g[0] = srgb_encode_c(rgb_.g, linear_)
+                b[0] = srgb_encode_c(rgb_.b, linear_)
 
 
 
@@ -1260,7 +2050,7 @@ cdef inline void saturation_buffer_mask_inplace_c(
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
-cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_, float shift_):
+cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_, float shift_, bint linear_):
     """
     CHANGE SATURATION LEVEL (INPLACE) 
 
@@ -1280,6 +2070,7 @@ cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_
 
     :param rgb_array_: numpy.ndarray shape (w, h, 3) containing RGB values uint8
     :param shift_    : float; value in range[-1.0...1.0], control the saturation level
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB decoded)
     :return          : void
     """
 
@@ -1301,21 +2092,22 @@ cdef inline void saturation_array24_inplace_c(unsigned char [:, :, :] rgb_array_
         for j in prange(height, schedule=SCHEDULE, num_threads=THREADS):
             for i in range(width):
                 r, g, b = &rgb_array_[i, j, 0], &rgb_array_[i, j, 1], &rgb_array_[i, j, 2]
-                hsl_ = struct_rgb_to_hsl(<float>r[0] * ONE_255, <float>g[0] * ONE_255, <float>b[0] * ONE_255)
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
 
                 s = min((hsl_.s + shift_), 0.5)
                 s = max(s, 0.0)
                 rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                r[0] = <unsigned char>(rgb_.r * 255.0)
-                g[0] = <unsigned char>(rgb_.g * 255.0)
-                b[0] = <unsigned char>(rgb_.b * 255.0)
+                r[0] = srgb_encode_c(rgb_.r, linear_)
+                g[0] = srgb_encode_c(rgb_.g, linear_)
+                b[0] = srgb_encode_c(rgb_.b, linear_)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
 @cython.cdivision(True)
-cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array_, float shift_):
+cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array_, float shift_, bint linear_):
     """
     CHANGE SATURATION LEVEL (INPLACE) 
     
@@ -1335,6 +2127,7 @@ cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array
     
     :param rgba_array_: numpy.ndarray shape (w, h, 4) containing RGBA values uint8
     :param shift_    : float; value in range[-1.0...1.0], control the saturation level
+    :param linear_   : bool; True the saturation is changed in linear light (sRGB decoded)
     :return          : void
     """
 
@@ -1358,12 +2151,112 @@ cdef inline void saturation_array32_inplace_c(unsigned char [:, :, :] rgba_array
                 g = &rgba_array_[i, j, 1]
                 b = &rgba_array_[i, j, 2]
 
-                hsl_ = struct_rgb_to_hsl(<float> r[0] * ONE_255, <float> g[0] * ONE_255, <float> b[0] * ONE_255)
+                hsl_ = struct_rgb_to_hsl(
+                    srgb_decode_c(r[0], linear_), srgb_decode_c(g[0], linear_), srgb_decode_c(b[0], linear_))
 
                 s = min((hsl_.s + shift_), 0.5)
                 s = max(s, 0.0)
 
                 rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
-                r[0] = <unsigned char> (rgb_.r * 255.0)
-                g[0] = <unsigned char> (rgb_.g * 255.0)
-                b[0] = <unsigned char> (rgb_.b * 255.0)
\ No newline at end of file
+                r[0] = srgb_encode_c(rgb_.r, linear_)
+                g[0] = srgb_encode_c(rgb_.g, linear_)
+                b[0] = srgb_encode_c(rgb_.b, linear_)
+
+
+# ----------------C API (NOGIL) -----------------
+# The functions below are declared in saturation.pxd and can be cimported by
+# other Cython modules (from SaturationEffect.saturation cimport saturate_rgb_row)
+# they are also exported as a PyCapsule C-API for C extensions (header
+# saturation_api.h generated by cython, call the import function of the header
+# before using the functions).
+# The functions work on raw pointers, they are sequential and thread safe, the
+# caller is responsible for the parallelisation (e.g one tile per thread).
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef api void saturate_rgb_row(
+        unsigned char * row_,
+        int width,
+        int pixel_stride,
+        float shift_
+) nogil:
+    """
+    CHANGE THE SATURATION LEVEL OF A ROW OF PIXELS (INPLACE)
+    
+    Each pixel is composed of 3 consecutive bytes in the order RGB, followed by 
+    <pixel_stride> - 3 bytes left unchanged (e.g alpha channel). 
+    
+    :param row_        : pointer to the first pixel of the row (red channel)
+    :param width       : integer; number of pixels
+    :param pixel_stride: integer; number of bytes between two pixels (3 for RGB, 4 for RGBA)
+    :param shift_      : float; Value must be in range [-1.0 ... 1.0], negative values 
+    decrease saturation
+    :return            : void
+    """
+    cdef:
+        int i
+        unsigned char *p
+        float s
+        hsl hsl_
+        rgb rgb_
+
+    for i in range(width):
+        p = row_ + i * pixel_stride
+        hsl_ = struct_rgb_to_hsl(<float>p[0] * ONE_255, <float>p[1] * ONE_255, <float>p[2] * ONE_255)
+        s = min((hsl_.s + shift_), 1.0)
+        s = max(s, 0.0)
+        rgb_ = struct_hsl_to_rgb(hsl_.h, s, hsl_.l)
+        p[0] = <unsigned char>(rgb_.r * 255.0)
+        p[1] = <unsigned char>(rgb_.g * 255.0)
+        p[2] = <unsigned char>(rgb_.b * 255.0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef api void saturate_rgb_tile(
+        unsigned char * tile_,
+        int width,
+        int height,
+        int pixel_stride,
+        Py_ssize_t row_stride,
+        float shift_
+) nogil:
+    """
+    CHANGE THE SATURATION LEVEL OF A TILE (INPLACE)
+    
+    :param tile_       : pointer to the top left pixel of the tile (red channel)
+    :param width       : integer; width of the tile 
+    :param height      : integer; height of the tile
+    :param pixel_stride: integer; number of bytes between two pixels (3 for RGB, 4 for RGBA)
+    :param row_stride  : integer; number of bytes between two rows (surface pitch)
+    :param shift_      : float; Value must be in range [-1.0 ... 1.0]
+    :return            : void
+    """
+    cdef int j
+
+    for j in range(height):
+        saturate_rgb_row(tile_ + j * row_stride, width, pixel_stride, shift_)
+
+
+cdef api void saturate_rgba_tile(
+        unsigned char * tile_,
+        int width,
+        int height,
+        Py_ssize_t row_stride,
+        float shift_
+) nogil:
+    """
+    CHANGE THE SATURATION LEVEL OF A TILE RGBA (INPLACE), THE ALPHA CHANNEL IS UNCHANGED
+    
+    :param tile_     : pointer to the top left pixel of the tile (red channel)
+    :param width     : integer; width of the tile 
+    :param height    : integer; height of the tile
+    :param row_stride: integer; number of bytes between two rows (surface pitch)
+    :param shift_    : float; Value must be in range [-1.0 ... 1.0]
+    :return          : void
+    """
+    saturate_rgb_tile(tile_, width, height, 4, row_stride, shift_)
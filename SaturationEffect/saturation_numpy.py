@@ -0,0 +1,977 @@
+"""
+MIT License
+
+Copyright (c) 2019 Yoann Berenguer
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+PURE NUMPY IMPLEMENTATION (FALLBACK BACKEND)
+
+Same API than the compiled module saturation.pyx, used when the Cython extension is not
+built for the platform (see BACKEND in __init__.py). The HSL transformations are the
+vectorized equivalent of hsl_c.c; the images are processed in chunks of CHUNK_SIZE pixels
+(rows of the output image) to keep the float temporaries small whatever the image size.
+"""
+
+# NUMPY IS REQUIRED
+try:
+    import numpy
+    from numpy import empty, zeros, uint8, float32, float64
+    from numpy.lib.stride_tricks import as_strided
+except ImportError:
+    raise ImportError("\n<numpy> library is missing on your system."
+                      "\nTry: \n   C:\\pip install numpy on a window command prompt.")
+
+# PYGAME IS REQUIRED
+try:
+    import pygame
+    from pygame.surfarray import pixels3d, pixels_alpha
+except ImportError:
+    raise ImportError("\n<Pygame> library is missing on your system."
+                      "\nTry: \n   C:\\pip install pygame on a window command prompt.")
+
+__version__ = 1.01
+
+# Number of pixels processed per chunk (each float64 temporary is 8 * CHUNK_SIZE bytes)
+CHUNK_SIZE = 1 << 16
+
+ONE_255 = 1.0 / 255.0
+ONE_THIRD = 1.0 / 3.0
+LINEAR_LEVELS = 4096
+
+
+def _srgb_tables():
+    """
+    BUILD THE sRGB TRANSFER FUNCTION LOOKUP TABLES (SAME VALUES THAN srgb_tables_c)
+
+    :return: tuple (decode table float32 256 values, encode table uint8 LINEAR_LEVELS values)
+    """
+    v = numpy.arange(256) * ONE_255
+    decode = numpy.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4).astype(float32)
+    v = numpy.arange(LINEAR_LEVELS) / (LINEAR_LEVELS - 1)
+    v = numpy.where(v <= 0.0031308, v * 12.92, 1.055 * v ** (1.0 / 2.4) - 0.055)
+    encode = (v * 255.0 + 0.5).astype(uint8)
+    return decode, encode
+
+
+SRGB_TO_LINEAR, LINEAR_TO_SRGB = _srgb_tables()
+
+
+def _chunks(rows, row_length, multiple=1):
+    """
+    SPLIT <rows> INTO CHUNKS OF ABOUT CHUNK_SIZE PIXELS
+
+    :param rows      : integer; number of rows
+    :param row_length: integer; number of pixels per row
+    :param multiple  : integer; the chunks contain a multiple of <multiple> rows
+    :return          : generator of (start, stop) rows
+    """
+    step = max(CHUNK_SIZE // max(row_length, 1) // multiple, 1) * multiple
+    for start in range(0, rows, step):
+        yield start, min(start + step, rows)
+
+
+def _decode(rgb, linear_):
+    """
+    CONVERT PIXEL VALUES INTO NORMALIZED VALUES [0.0 ... 1.0] (SEE srgb_decode_c)
+
+    :param rgb    : numpy.ndarray uint8
+    :param linear_: bool; True decode the values into linear light
+    :return       : numpy.ndarray float64
+    """
+    if linear_:
+        return SRGB_TO_LINEAR[rgb].astype(float64)
+    return rgb * ONE_255
+
+
+def _encode(rgb, linear_):
+    """
+    CONVERT NORMALIZED VALUES [0.0 ... 1.0] INTO PIXEL VALUES (SEE srgb_encode_c)
+
+    :param rgb    : numpy.ndarray float64
+    :param linear_: bool; True encode the linear light values into sRGB
+    :return       : numpy.ndarray uint8
+    """
+    if linear_:
+        return LINEAR_TO_SRGB[(numpy.clip(rgb, 0.0, 1.0) * (LINEAR_LEVELS - 1) + 0.5).astype(numpy.intp)]
+    return (rgb * 255.0).astype(uint8)
+
+
+def _rgb_to_hsl(r, g, b):
+    """
+    CONVERT NORMALIZED RGB VALUES INTO HSL (VECTORIZED struct_rgb_to_hsl)
+
+    :param r: numpy.ndarray float64 red values [0.0 ... 1.0]
+    :param g: numpy.ndarray float64 green values [0.0 ... 1.0]
+    :param b: numpy.ndarray float64 blue values [0.0 ... 1.0]
+    :return : tuple of numpy.ndarray (hue, saturation, lightness)
+    """
+    cmax = numpy.maximum(numpy.maximum(r, g), b)
+    cmin = numpy.minimum(numpy.minimum(r, g), b)
+    delta = cmax - cmin
+    l = (cmax + cmin) / 2.0
+    grey = delta == 0
+    delta[grey] = 1.0
+
+    t = (g - b) / delta
+    t = numpy.where(t > 6.0, numpy.fmod(t, 6.0), numpy.where(t < 0.0, 6.0 - numpy.abs(t), t))
+    h = numpy.where(cmax == r, 60.0 * t, numpy.where(
+        cmax == g, 60.0 * ((b - r) / delta + 2.0), 60.0 * ((r - g) / delta + 4.0)))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        s = numpy.where(l <= 0.5, delta / (cmax + cmin), delta / (2.0 - cmax - cmin))
+
+    h[grey] = 0.0
+    s[grey] = 0.0
+    return h / 360.0, s, l
+
+
+def _hue_to_rgb(m1, m2, h):
+    """
+    VECTORIZED hue_to_rgb
+
+    :return: numpy.ndarray float64
+    """
+    h = numpy.where(h > 1.0, numpy.fmod(h, 1.0), numpy.where(h < 0.0, 1.0 - numpy.abs(h), h))
+    return numpy.where(h < 1.0 / 6.0, m1 + (m2 - m1) * h * 6.0, numpy.where(
+        h < 0.5, m2, numpy.where(h < 2.0 / 3.0, m1 + (m2 - m1) * (2.0 / 3.0 - h) * 6.0, m1)))
+
+
+def _hsl_to_rgb(h, s, l):
+    """
+    CONVERT HSL VALUES INTO NORMALIZED RGB VALUES (VECTORIZED struct_hsl_to_rgb)
+
+    :return: numpy.ndarray float64 shape (..., 3)
+    """
+    m2 = numpy.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+    rgb = numpy.stack((_hue_to_rgb(m1, m2, h + ONE_THIRD),
+                       _hue_to_rgb(m1, m2, h),
+                       _hue_to_rgb(m1, m2, h - ONE_THIRD)), axis=-1)
+    grey = s == 0.0
+    rgb[grey] = l[grey, None]
+    return rgb
+
+
+def _shift(s, shift_, smax, single=False):
+    """
+    ADD <shift_> TO THE SATURATION AND CLIP TO [0.0 ... smax] (float32 AS THE KERNELS)
+
+    :param single: bool; True the saturation is rounded to float32 before the addition
+    (32-bit and buffer kernels)
+    :return: numpy.ndarray float64
+    """
+    if single:
+        s = s.astype(float32).astype(float64)
+    s = numpy.minimum(s + float(float32(shift_)), smax).astype(float32)
+    return numpy.maximum(s, 0.0).astype(float64)
+
+
+def _saturate(rgb, shift_, smax, linear_, single=False):
+    """
+    CHANGE THE SATURATION OF A CHUNK OF PIXELS
+
+    :param rgb    : numpy.ndarray (..., 3) uint8 RGB values
+    :param shift_ : float; Value must be in range [-1.0 ... 1.0]
+    :param smax   : float; maximum saturation (0.5 or 1.0, see saturation24 / saturation32)
+    :param linear_: bool; True the saturation is changed in linear light
+    :param single : bool; see _shift
+    :return       : numpy.ndarray (..., 3) float64 normalized RGB values
+    """
+    v = _decode(rgb, linear_)
+    h, s, l = _rgb_to_hsl(v[..., 0], v[..., 1], v[..., 2])
+    return _hsl_to_rgb(h, _shift(s, shift_, smax, single), l)
+
+
+def _check_array(array_, ndim, name):
+    """
+    CHECK AN ARRAY ARGUMENT (SAME ERRORS THAN THE TYPED MEMORYVIEWS OF THE COMPILED MODULE)
+
+    :param array_: numpy.ndarray uint8
+    :param ndim  : integer; number of dimensions expected (3 for RGB pixels, 2 for alpha values)
+    :param name  : string; name of the argument
+    :return      : void
+    """
+    if not hasattr(array_, 'ndim') or array_.ndim != ndim:
+        raise ValueError("\nArgument %s has the wrong number of dimensions (expecting %s)" % (name, ndim))
+    if array_.dtype != uint8:
+        raise ValueError("\nArgument %s dtype mismatch, expecting uint8 got %s " % (name, array_.dtype))
+
+
+def _mask_scale(width, height, mask_width, mask_height):
+    """
+    RETURN THE REDUCTION FACTOR OF A MASK OR 0 (SEE mask_scale_c)
+    """
+    if width <= 0 or height <= 0 or mask_width <= 0 or mask_height <= 0:
+        return 0
+    # ceil(n / scale) == m for scale in range [ceil(n / m) ... ceil(n / (m - 1)) - 1]
+    scale_ = max(-(-width // mask_width), -(-height // mask_height))
+    upper = max(width, height)
+    if mask_width > 1:
+        upper = min(upper, -(-width // (mask_width - 1)) - 1)
+    if mask_height > 1:
+        upper = min(upper, -(-height // (mask_height - 1)) - 1)
+    if scale_ < 1 or scale_ > upper:
+        return 0
+    return scale_
+
+
+def _block_scale(width, height, scale_):
+    """
+    RETURN THE BLOCK SIZE OF A REDUCED MASK BUILT WITH THE FACTOR scale_ (SEE block_scale_c)
+    """
+    block = _mask_scale(width, height, -(-width // scale_), -(-height // scale_))
+    return block if block > 0 else scale_
+
+
+def _check_mask(mask_, width, height):
+    """
+    CHECK THE MASK ARGUMENT OF THE SATURATION METHODS
+
+    :return: tuple (mask float32 or None, mask scale)
+    """
+    if mask_ is None:
+        return None, 1
+
+    if not isinstance(mask_, numpy.ndarray):
+        raise ValueError(
+            "\nMask argument is invalid, expecting a "
+            "numpy.ndarray shape (w, h) got type %s " % type(mask_))
+
+    assert mask_.dtype == numpy.float32 or mask_.dtype == numpy.float64, \
+        "\nInvalid array data type expecting float32 or float64 got type %s " % mask_.dtype
+
+    try:
+        mw, mh = mask_.shape
+    except ValueError as e:
+        raise ValueError("\nMask argument is invalid "
+                         "expecting type (w, h) \n %s " % e)
+
+    mask_scale = _mask_scale(width, height, mw, mh)
+    assert mask_scale > 0, "\nArray and mask mismatch width or height"
+    return mask_.astype(float32, copy=False), mask_scale
+
+
+def _mask_rows(mask_, width, start, stop, mask_scale, bilinear_):
+    """
+    RETURN THE MASK VALUES OF THE IMAGE ROWS [start ... stop[ (SEE mask_value_c)
+
+    :return: numpy.ndarray (stop - start, width) float32
+    """
+    if mask_scale == 1:
+        return mask_[:, start:stop].T
+
+    i = numpy.arange(width)
+    j = numpy.arange(start, stop)
+    if not bilinear_:
+        return mask_[(i // mask_scale)[None, :], (j // mask_scale)[:, None]]
+
+    scale = float32(mask_scale)
+    fx = numpy.maximum((i.astype(float32) + float32(0.5)) / scale - float32(0.5), float32(0.0))
+    fy = numpy.maximum((j.astype(float32) + float32(0.5)) / scale - float32(0.5), float32(0.0))
+    x0 = fx.astype(numpy.intp)
+    y0 = fy.astype(numpy.intp)
+    x1 = numpy.minimum(x0 + 1, mask_.shape[0] - 1)
+    y1 = numpy.minimum(y0 + 1, mask_.shape[1] - 1)
+    dx = (fx - x0).astype(float32)[None, :]
+    dy = (fy - y0).astype(float32)[:, None]
+    x0, x1, y0, y1 = x0[None, :], x1[None, :], y0[:, None], y1[:, None]
+    return (mask_[x0, y0] * (float32(1.0) - dx) + mask_[x1, y0] * dx) * (float32(1.0) - dy) + \
+           (mask_[x0, y1] * (float32(1.0) - dx) + mask_[x1, y1] * dx) * dy
+
+
+def _saturation_mask(rgb_array_, alpha_array_, shift_, mask_, mask_scale, bilinear_, linear_):
+    """
+    SATURATION WITH AN OPTIONAL MASK (SEE saturation_array24_mask_c / saturation_array32_mask_c)
+
+    The saturated values are multiplied by the mask value, pixels with a mask value <= 0.0
+    are left unchanged.
+
+    :return: pygame.Surface 24-bit when alpha_array_ is None else 32-bit
+    """
+    width, height = rgb_array_.shape[:2]
+    bytesize = 3 if alpha_array_ is None else 4
+    single = alpha_array_ is not None
+    new_array = empty((height, width, bytesize), dtype=uint8)
+
+    for start, stop in _chunks(height, width):
+        rgb = rgb_array_[:, start:stop, :3].transpose(1, 0, 2)
+        if mask_ is None:
+            new_array[start:stop, :, :3] = _encode(_saturate(rgb, shift_, 1.0, linear_, single), linear_)
+        else:
+            m = _mask_rows(mask_, width, start, stop, mask_scale, bilinear_)
+            selected = m > 0
+            rgb = rgb[selected]
+            new_array[start:stop, :, :3] = rgb_array_[:, start:stop, :3].transpose(1, 0, 2)
+            new_array[start:stop, :, :3][selected] = _encode(
+                _saturate(rgb, shift_, 1.0, linear_, single) * m[selected, None].astype(float64), linear_)
+        if alpha_array_ is not None:
+            new_array[start:stop, :, 3] = alpha_array_[:, start:stop].T
+
+    return pygame.image.frombuffer(new_array, (width, height), 'RGB' if bytesize == 3 else 'RGBA')
+
+
+def saturation24_mask(array_, shift_, mask_, bilinear_=False, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN RGB ARRAY (OPTIONAL MASK)
+
+    :param array_   : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param shift_   : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param mask_    : numpy.ndarray (w, h) float values in range [0.0 ... 1.0] or None, the mask
+    can be a reduced resolution mask (see build_mask2d_* argument scale_)
+    :param bilinear_: bool; True bilinear filtering of a reduced resolution mask
+    :param linear_  : bool; True the saturation is changed in linear light
+    :return         : pygame.Surface 24-bit
+    """
+    assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+
+    assert isinstance(array_, numpy.ndarray), \
+        "\nInvalid array expecting a numpy.ndarray type (w, h, 3) got type %s " % type(array_)
+    assert array_.dtype == numpy.uint8, \
+        "\nInvalid array data type expecting uint8 got type %s " % array_.dtype
+
+    try:
+        w, h, bytesize = array_.shape
+    except ValueError as e:
+        raise ValueError("\nArray argument is invalid "
+                         "expecting type (w, h, 3) \n %s " % e)
+
+    mask_, mask_scale = _check_mask(mask_, w, h)
+    return _saturation_mask(array_, None, shift_, mask_, mask_scale, bilinear_, linear_)
+
+
+def saturation24_mask1(surface_, shift_, mask_, bilinear_=False, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A SURFACE (OPTIONAL MASK)
+
+    :param surface_ : pygame.Surface 24 - 32 bit (the alpha channel is disregarded)
+    :param shift_   : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param mask_    : numpy.ndarray (w, h) float values in range [0.0 ... 1.0] or None
+    :param bilinear_: bool; True bilinear filtering of a reduced resolution mask
+    :param linear_  : bool; True the saturation is changed in linear light
+    :return         : pygame.Surface 24-bit
+    """
+    assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+
+    assert isinstance(surface_, pygame.Surface), \
+        "\nInvalid surface type, expecting a pygame.Surface type got type %s " % type(surface_)
+
+    w, h = surface_.get_size()
+    mask_, mask_scale = _check_mask(mask_, w, h)
+    return _saturation_mask(pixels3d(surface_), None, shift_, mask_, mask_scale, bilinear_, linear_)
+
+
+def saturation32_mask(surface_, shift_, mask_, bilinear_=False, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A 32-BIT SURFACE (OPTIONAL MASK)
+
+    :param surface_ : pygame.Surface 32-bit with per-pixel transparency
+    :param shift_   : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param mask_    : numpy.ndarray (w, h) float values in range [0.0 ... 1.0] or None
+    :param bilinear_: bool; True bilinear filtering of a reduced resolution mask
+    :param linear_  : bool; True the saturation is changed in linear light
+    :return         : pygame.Surface 32-bit with per-pixel information
+    """
+    assert -1.0 <= shift_ <= 1.0, \
+        '\nshift_ argument must be in range [-1.0 .. 1.0].'
+    assert surface_.get_bytesize() == 4, \
+        "\nInvalid surface, the alpha channel is missing. \nImage byte size %s " % surface_.get_bytesize()
+
+    w, h = surface_.get_size()
+    mask_, mask_scale = _check_mask(mask_, w, h)
+
+    try:
+        rgb_array_ = pixels3d(surface_)
+    except (ValueError, pygame.error) as e:
+        raise ValueError("\nInvalid surface, surface should be 32-bit \n %s " % e)
+    try:
+        alpha_array_ = pixels_alpha(surface_)
+    except (ValueError, pygame.error) as e:
+        raise ValueError("\nInvalid surface, surface should be 32-bit"
+                         " with per-pixel transparency \n %s " % e)
+
+    return _saturation_mask(rgb_array_, alpha_array_, shift_, mask_, mask_scale, bilinear_, linear_)
+
+
+def saturation32_mask1(rgb_array_, alpha_array_, shift_, mask_, bilinear_=False, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN RGB ARRAY AND ALPHA CHANNEL (OPTIONAL MASK)
+
+    :param rgb_array_  : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param alpha_array_: numpy.ndarray (w, h) uint8 representing the alpha channel
+    :param shift_      : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param mask_       : numpy.ndarray (w, h) float values in range [0.0 ... 1.0] or None
+    :param bilinear_   : bool; True bilinear filtering of a reduced resolution mask
+    :param linear_     : bool; True the saturation is changed in linear light
+    :return            : pygame.Surface 32-bit with per-pixel information
+    """
+    assert -1.0 <= shift_ <= 1.0, \
+        '\nshift_ argument must be in range [-1.0 .. 1.0].'
+    assert isinstance(rgb_array_, numpy.ndarray), \
+        "\nArgument rgb_array is invalid expecting a numpy.ndarray got %s " % type(rgb_array_)
+    assert isinstance(alpha_array_, numpy.ndarray), \
+        "\nArgument alpha_array_ is invalid expecting a numpy.ndarray got %s " % type(alpha_array_)
+
+    try:
+        w, h, bytesize = rgb_array_.shape
+    except ValueError as e:
+        raise ValueError("\nrgb_array_ argument is invalid "
+                         "expecting type (w, h, 3) \n %s " % e)
+
+    assert (w, h) == alpha_array_.shape[:2], \
+        "\nrgb_array and alpha_array mismatch width or height"
+
+    mask_, mask_scale = _check_mask(mask_, w, h)
+    return _saturation_mask(rgb_array_, alpha_array_, shift_, mask_, mask_scale, bilinear_, linear_)
+
+
+def _saturation_subsample(array_, alpha_, shift_, subsample_, smax):
+    """
+    APPROXIMATED SATURATION, GAIN COMPUTED PER BLOCK subsample_ x subsample_
+    (SEE saturation_array_subsample_c)
+
+    :return: pygame.Surface 24-bit when alpha_ is None else 32-bit
+    """
+    width, height = array_.shape[:2]
+    bytesize = 3 if alpha_ is None else 4
+    new_array = empty((height, width, bytesize), dtype=uint8)
+    columns = numpy.arange(0, width, subsample_)
+
+    for start, stop in _chunks(height, width, subsample_):
+        rgb = array_[:, start:stop, :3].transpose(1, 0, 2).astype(float32)
+        rows = numpy.arange(0, stop - start, subsample_)
+
+        # Average colour of each block
+        total = numpy.add.reduceat(numpy.add.reduceat(rgb, rows, axis=0), columns, axis=1)
+        count = numpy.add.reduceat(numpy.add.reduceat(
+            numpy.ones(rgb.shape[:2], dtype=numpy.int32), rows, axis=0), columns, axis=1)
+        mean = (total / count[..., None].astype(float32)).astype(float64) * ONE_255
+        h, s, l = _rgb_to_hsl(mean[..., 0], mean[..., 1], mean[..., 2])
+
+        # Saturation gain of each block
+        gain = numpy.ones(s.shape, dtype=float32)
+        numpy.divide(_shift(s, shift_, smax), s, out=gain, where=s > 0.0, casting='unsafe')
+        gain = numpy.repeat(numpy.repeat(gain, subsample_, axis=0), subsample_, axis=1)
+        gain = gain[:stop - start, :width, None]
+
+        # Apply the gain to each pixel (lightness unchanged)
+        l = ((rgb.max(axis=2) + rgb.min(axis=2)) * float32(0.5))[..., None]
+        new_array[start:stop, :, :3] = numpy.clip(l + (rgb - l) * gain, 0.0, 255.0).astype(uint8)
+        if alpha_ is not None:
+            new_array[start:stop, :, 3] = alpha_[:, start:stop].T
+
+    return pygame.image.frombuffer(new_array, (width, height), 'RGB' if bytesize == 3 else 'RGBA')
+
+
+def _saturation(array_, alpha_, shift_, smax, linear_):
+    """
+    CHANGE THE SATURATION LEVEL (SEE saturation_array24_c / saturation_array32_c)
+
+    :return: pygame.Surface 24-bit when alpha_ is None else 32-bit
+    """
+    width, height = array_.shape[:2]
+    bytesize = 3 if alpha_ is None else 4
+    new_array = empty((height, width, bytesize), dtype=uint8)
+
+    for start, stop in _chunks(height, width):
+        rgb = array_[:, start:stop, :3].transpose(1, 0, 2)
+        new_array[start:stop, :, :3] = _encode(
+            _saturate(rgb, shift_, smax, linear_, alpha_ is not None), linear_)
+        if alpha_ is not None:
+            new_array[start:stop, :, 3] = alpha_[:, start:stop].T
+
+    return pygame.image.frombuffer(new_array, (width, height), 'RGB' if bytesize == 3 else 'RGBA')
+
+
+def saturation24(array_, shift_, subsample_=1, linear_=False):
+    """
+    CHANGE SATURATION LEVEL
+
+    :param array_    : numpy.ndarray (w, h, 3) uint8 representing a 24-32 bit surface
+    :param shift_    : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param subsample_: integer; 1 exact HSL transformation (default), n > 1 approximation with
+    the saturation gain computed per block nxn, e.g 2 or 4
+    :param linear_   : bool; True the saturation is changed in linear light
+    :return: Return a pygame.Surface 24-bit without per-pixel information
+    """
+    assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+    assert subsample_ >= 1, '\nArgument subsample_ must be >= 1 got %s ' % subsample_
+    assert not (linear_ and subsample_ > 1), '\nArgument linear_ is not compatible with subsample_ > 1'
+
+    try:
+        width, height = array_.shape[:2]
+    except (pygame.error, ValueError) as e:
+        raise ValueError('\nArray type <array_> not understood \n%s ' % e)
+
+    _check_array(array_, 3, 'array_')
+
+    if subsample_ > 1:
+        return _saturation_subsample(array_, None, shift_, subsample_, 0.5)
+
+    return _saturation(array_, None, shift_, 0.5, linear_)
+
+
+def saturation32(array_, alpha_, shift_, subsample_=1, linear_=False):
+    """
+    CHANGE SATURATION LEVEL
+
+    :param array_    : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param alpha_    : numpy.ndarray (w, h) uint8 representing the alpha channel
+    :param shift_    : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param subsample_: integer; 1 exact HSL transformation (default), n > 1 approximation with
+    the saturation gain computed per block nxn, e.g 2 or 4
+    :param linear_   : bool; True the saturation is changed in linear light
+    :return: a pygame.Surface 32-bit with per-pixel information
+    """
+    assert -1.0 <= shift_ <= 1.0, '\nArgument shift_ must be in range [-1.0 .. 1.0].'
+    assert subsample_ >= 1, '\nArgument subsample_ must be >= 1 got %s ' % subsample_
+    assert not (linear_ and subsample_ > 1), '\nArgument linear_ is not compatible with subsample_ > 1'
+
+    try:
+        width, height = array_.shape[:2]
+    except (ValueError, pygame.error) as e:
+        raise ValueError('\nArray <array_> type not understood \n%s ' % e)
+
+    try:
+        alpha_width, alpha_height = alpha_.shape[:2]
+    except (ValueError, pygame.error) as e:
+        raise ValueError('\nArray <alpha_> type not understood \n%s ' % e)
+
+    assert width == alpha_width and height == alpha_height, \
+        "rgb array and alpha channel mismatch width or height "
+
+    _check_array(array_, 3, 'array_')
+    _check_array(alpha_, 2, 'alpha_')
+
+    if subsample_ > 1:
+        return _saturation_subsample(array_, alpha_, shift_, subsample_, 1.0)
+
+    return _saturation(array_, alpha_, shift_, 1.0, linear_)
+
+
+def saturation_levels(array_, alpha_, shifts_, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN IMAGE FOR SEVERAL SHIFT VALUES (SINGLE PASS)
+
+    :param array_ : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param alpha_ : numpy.ndarray (w, h) uint8 representing the alpha channel or None
+    :param shifts_: sequence of float; each value must be in range [-1.0 ... 1.0]
+    :param linear_: bool; True the saturation is changed in linear light
+    :return       : list of pygame.Surface (one per shift value) 24-bit when alpha_ is None
+    else 32-bit with per-pixel information
+    """
+    try:
+        width, height = array_.shape[:2]
+    except (ValueError, pygame.error, AttributeError) as e:
+        raise ValueError('\nArray <array_> type not understood \n%s ' % e)
+
+    if alpha_ is not None:
+        assert (width, height) == alpha_.shape[:2], \
+            "rgb array and alpha channel mismatch width or height "
+        _check_array(alpha_, 2, 'alpha_')
+    _check_array(array_, 3, 'array_')
+
+    shifts = numpy.ascontiguousarray(shifts_, dtype=float32).ravel()
+    assert (shifts >= -1.0).all() and (shifts <= 1.0).all(), \
+        '\nArgument shifts_ values must be in range [-1.0 .. 1.0].'
+
+    bytesize = 3 if alpha_ is None else 4
+    smax = 0.5 if alpha_ is None else 1.0
+    outputs = [empty((height, width, bytesize), dtype=uint8) for _ in range(len(shifts))]
+
+    for start, stop in _chunks(height, width):
+        # HSL conversion done once for all the shift values
+        v = _decode(array_[:, start:stop, :3].transpose(1, 0, 2), linear_)
+        h, s, l = _rgb_to_hsl(v[..., 0], v[..., 1], v[..., 2])
+        for shift, output in zip(shifts, outputs):
+            output[start:stop, :, :3] = _encode(_hsl_to_rgb(h, _shift(s, shift, smax), l), linear_)
+            if alpha_ is not None:
+                output[start:stop, :, 3] = alpha_[:, start:stop].T
+
+    return [pygame.image.frombuffer(
+        output, (width, height), 'RGB' if bytesize == 3 else 'RGBA') for output in outputs]
+
+
+def saturation_stats(array_, alpha_=None, bins_=256, percentiles_=(5.0, 50.0, 95.0)):
+    """
+    HSL SATURATION STATISTICS OF AN IMAGE (HISTOGRAM, MEAN AND PERCENTILES)
+
+    :param array_      : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param alpha_      : numpy.ndarray (w, h) uint8 representing the alpha channel or None
+    :param bins_       : integer; number of histogram bins over the saturation range [0.0 ... 1.0]
+    :param percentiles_: sequence of float; percentiles in range [0.0 ... 100.0]
+    :return            : dict {'histogram': numpy.ndarray (bins_,) int64, 'count': number of
+    pixels, 'mean': mean saturation, 'percentiles': numpy.ndarray float32 saturation values}
+    """
+    assert bins_ > 0, '\nArgument bins_ must be > 0 got %s ' % bins_
+
+    try:
+        width, height = array_.shape[:2]
+    except (ValueError, pygame.error, AttributeError) as e:
+        raise ValueError('\nArray <array_> type not understood \n%s ' % e)
+
+    if alpha_ is not None:
+        assert (width, height) == alpha_.shape[:2], \
+            "rgb array and alpha channel mismatch width or height "
+        _check_array(alpha_, 2, 'alpha_')
+    _check_array(array_, 3, 'array_')
+
+    percentiles = numpy.asarray(percentiles_, dtype=float64).ravel()
+    assert ((percentiles >= 0.0) & (percentiles <= 100.0)).all(), \
+        '\nArgument percentiles_ values must be in range [0.0 .. 100.0].'
+
+    histogram = zeros(bins_, dtype=numpy.int64)
+    total = 0.0
+    for start, stop in _chunks(height, width):
+        v = array_[:, start:stop, :3].transpose(1, 0, 2)
+        if alpha_ is not None:
+            v = v[alpha_[:, start:stop].T != 0]
+        v = v * ONE_255
+        s = _rgb_to_hsl(v[..., 0], v[..., 1], v[..., 2])[1].ravel()
+        histogram += numpy.bincount(
+            numpy.clip((s * bins_).astype(numpy.intp), 0, bins_ - 1), minlength=bins_)
+        total += s.sum()
+
+    count = int(histogram.sum())
+
+    values = zeros(len(percentiles), dtype=float32)
+    if count > 0:
+        cumulative = histogram.cumsum()
+        rank = percentiles * 0.01 * count
+        index = numpy.minimum(numpy.searchsorted(cumulative, rank), bins_ - 1)
+        before = cumulative[index] - histogram[index]
+        fraction = (rank - before) / numpy.maximum(histogram[index], 1)
+        values[:] = (index + numpy.clip(fraction, 0.0, 1.0)) / bins_
+
+    return {'histogram': histogram,
+            'count': count,
+            'mean': total / count if count > 0 else 0.0,
+            'percentiles': values}
+
+
+def _auto_shift(histogram_, target_mean, smax):
+    """
+    SHIFT VALUE GIVING A MEAN SATURATION OF <target_mean> (SEE auto_shift_c)
+
+    :return: shift value in range [-1.0 ... 1.0]
+    """
+    count = histogram_.sum()
+    if count == 0:
+        return 0.0
+
+    centres = (numpy.arange(len(histogram_)) + 0.5) / len(histogram_)
+    low, high, shift = -1.0, 1.0, 0.0
+    for _ in range(32):
+        shift = (low + high) * 0.5
+        if (numpy.clip(centres + shift, 0.0, smax) * histogram_).sum() / count < target_mean:
+            low = shift
+        else:
+            high = shift
+    return float(float32(shift))
+
+
+def auto_saturation(array_, target_mean, alpha_=None, bins_=256):
+    """
+    CHANGE THE SATURATION LEVEL TO REACH A GIVEN MEAN SATURATION
+
+    :param array_     : numpy.ndarray (w, h, 3) uint8 representing the RGB pixels
+    :param target_mean: float; mean saturation wanted, in range [0.0 ... 1.0]
+    :param alpha_     : numpy.ndarray (w, h) uint8 representing the alpha channel or None
+    :param bins_      : integer; number of histogram bins
+    :return           : pygame.Surface 24-bit when alpha_ is None else 32-bit with per-pixel
+    information
+    """
+    assert 0.0 <= target_mean <= 1.0, '\nArgument target_mean must be in range [0.0 .. 1.0].'
+
+    stats = saturation_stats(array_, alpha_, bins_, ())
+    shift = _auto_shift(stats['histogram'], target_mean, 0.5 if alpha_ is None else 1.0)
+
+    if alpha_ is None:
+        return saturation24(array_, shift)
+    return saturation32(array_, alpha_, shift)
+
+
+def _pixel_format(format_, width, pitch_):
+    """
+    RETURN THE PIXEL FORMAT OF A BUFFER (SEE pixel_format_c)
+
+    :return: tuple (r, g, b, a offsets, bytes per pixel, row pitch), a is -1 without alpha channel
+    """
+    format_ = format_.upper()
+    if len(format_) not in (3, 4) or \
+            format_.count('R') != 1 or format_.count('G') != 1 or format_.count('B') != 1 or \
+            (len(format_) == 4 and format_.count('A') + format_.count('X') != 1):
+        raise ValueError("\nPixel format not understood, expecting a channel order "
+                         "such as 'RGB', 'BGR', 'RGBA', 'BGRA' got %s " % format_)
+
+    bytesize = len(format_)
+    pitch = pitch_ if pitch_ != 0 else width * bytesize
+    if pitch < width * bytesize:
+        raise ValueError("\nRow pitch is too small, expecting at least %s got %s "
+                         % (width * bytesize, pitch))
+    return format_.index('R'), format_.index('G'), format_.index('B'), format_.find('A'), bytesize, pitch
+
+
+def _buffer_view(buffer_, shift_, mask_array, width, height, pixel_format, readonly):
+    """
+    CHECK THE ARGUMENTS AND RETURN A VIEW (h, w, bytesize) OF THE BUFFER (SEE buffer_view_c)
+
+    :return: tuple (numpy.ndarray (h, w, bytesize) uint8 referencing the buffer, mask (h, w) or None)
+    """
+    assert isinstance(shift_, float), \
+        'Expecting float for argument shift_, got %s ' % type(shift_)
+    assert -1.0 <= shift_ <= 1.0, 'Argument shift_ must be in range [-1.0 .. 1.0].'
+
+    bytesize, pitch = pixel_format[4:]
+
+    try:
+        view_ = memoryview(buffer_)
+        if view_.ndim != 1 or view_.format != 'B':
+            view_ = view_.cast('B')
+    except (TypeError, ValueError) as e:
+        raise ValueError("\nIncompatible buffer type got %s.\n%s " % (type(buffer_), e))
+
+    if not readonly and view_.readonly:
+        raise ValueError("\nBuffer is read-only, expecting a writable buffer got %s." % type(buffer_))
+
+    if len(view_) < (height - 1) * pitch + width * bytesize:
+        raise ValueError(
+            "\nBuffer length is too small for the image size and pixel format, %s " % len(view_))
+
+    if mask_array is not None:
+        try:
+            m_length = len(mask_array)
+        except (ValueError, TypeError):
+            raise ValueError("\nIncompatible mask type got %s." % type(mask_array))
+
+        if m_length != width * height:
+            raise ValueError(
+                "\nMask length and image size mismatch, %s %s" % (width * height, m_length))
+        mask_array = numpy.asarray(mask_array, dtype=float32).reshape(height, width)
+
+    array_ = numpy.frombuffer(view_, dtype=uint8)
+    array_ = as_strided(array_, (height, width, bytesize), (pitch, bytesize, 1), writeable=not readonly)
+    return array_, mask_array
+
+
+def saturation_buffer_mask(buffer_, shift_, mask_array, width_, height_, format_='RGB', pitch_=0,
+                           linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A BUFFER (RETURN A NEW SURFACE)
+
+    :param buffer_   : buffer containing the pixels, rows of <width_> pixels separated by <pitch_> bytes
+    :param shift_    : float; Value must be in range [-1.0 ... 1.0]
+    :param mask_array: 1d numpy.ndarray float32 or float64 of width_ * height_ values (row order) or None.
+    Pixels with a mask value <= 0.0 are left unchanged
+    :param width_    : integer; width of the image
+    :param height_   : integer; height of the image
+    :param format_   : string; channel order e.g 'RGB', 'BGR', 'RGBA', 'BGRA', 'ARGB', 'RGBX'
+    :param pitch_    : integer; number of bytes per row (including padding), 0 for packed rows
+    :param linear_   : bool; True the saturation is changed in linear light
+    :return          : a pygame.Surface 24-bit (RGB) or 32-bit (RGBA) when the format
+    contains an alpha channel
+    """
+    pixel_format = _pixel_format(format_, width_, pitch_)
+    array_, mask_array = _buffer_view(buffer_, shift_, mask_array, width_, height_, pixel_format, True)
+    r, g, b, a = pixel_format[:4]
+    bytesize = 4 if a >= 0 else 3
+    new_array = empty((height_, width_, bytesize), dtype=uint8)
+
+    for start, stop in _chunks(height_, width_):
+        rgb = array_[start:stop][..., [r, g, b]]
+        if mask_array is None:
+            new_array[start:stop, :, :3] = _encode(_saturate(rgb, shift_, 1.0, linear_, True), linear_)
+        else:
+            selected = mask_array[start:stop] > 0.0
+            new_array[start:stop, :, :3] = rgb
+            new_array[start:stop, :, :3][selected] = _encode(
+                _saturate(rgb[selected], shift_, 1.0, linear_, True), linear_)
+        if a >= 0:
+            new_array[start:stop, :, 3] = array_[start:stop, :, a]
+
+    return pygame.image.frombuffer(new_array, (width_, height_), 'RGBA' if bytesize == 4 else 'RGB')
+
+
+def saturation_buffer_mask_inplace(buffer_, shift_, mask_array, width_, height_, format_='RGB', pitch_=0,
+                                   linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A BUFFER (INPLACE)
+
+    Same arguments than saturation_buffer_mask, the buffer must be writable
+
+    :return: void
+    """
+    pixel_format = _pixel_format(format_, width_, pitch_)
+    array_, mask_array = _buffer_view(buffer_, shift_, mask_array, width_, height_, pixel_format, False)
+    channels = list(pixel_format[:3])
+
+    for start, stop in _chunks(height_, width_):
+        rgb = array_[start:stop][..., channels]
+        if mask_array is None:
+            array_[start:stop, :, channels] = _encode(_saturate(rgb, shift_, 1.0, linear_, True), linear_)
+        else:
+            selected = mask_array[start:stop] > 0.0
+            rgb[selected] = _encode(_saturate(rgb[selected], shift_, 1.0, linear_, True), linear_)
+            array_[start:stop, :, channels] = rgb
+
+
+def _saturation_inplace(array_, shift_, linear_):
+    """
+    CHANGE THE SATURATION LEVEL OF AN ARRAY (w, h, 3) OR (w, h, 4) INPLACE
+
+    :return: void
+    """
+    _check_array(array_, 3, 'array_')
+    width, height = array_.shape[:2]
+    for start, stop in _chunks(height, width):
+        rgb = array_[:, start:stop, :3]
+        rgb[...] = _encode(_saturate(rgb, shift_, 0.5, linear_), linear_)
+
+
+def saturation24_inplace(array_, shift_, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN RGB ARRAY INPLACE (E.G pixels3d)
+
+    :param array_ : numpy.ndarray (w, h, 3) uint8 referencing the surface pixels
+    :param shift_ : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param linear_: bool; True the saturation is changed in linear light
+    :return       : void
+    """
+    assert -1.0 <= shift_ <= 1.0, \
+        "Argument shift must be in range[-1.0 ... 1.0]"
+
+    _saturation_inplace(array_, shift_, linear_)
+
+
+def saturation32_inplace(array_, shift_, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF AN RGB(A) ARRAY INPLACE, THE ALPHA CHANNEL IS NOT MODIFIED
+
+    :param array_ : numpy.ndarray (w, h, 3) or (w, h, 4) uint8 referencing the surface pixels
+    :param shift_ : Value must be in range [-1.0 ... 1.0], negative values decrease saturation
+    :param linear_: bool; True the saturation is changed in linear light
+    :return       : void
+    """
+    assert -1.0 <= shift_ <= 1.0, \
+        "Argument shift must be in range[-1.0 ... 1.0]"
+
+    _saturation_inplace(array_, shift_, linear_)
+
+
+def _block_sum(array_, scale_, start, stop):
+    """
+    SUM OF THE BLOCKS scale_ x scale_ OF THE COLUMNS [start ... stop[ OF AN ARRAY (w, h)
+
+    :return: tuple (sums float64, number of pixels per block)
+    """
+    array_ = array_[start:stop].astype(float64)
+    rows = numpy.arange(0, array_.shape[0], scale_)
+    columns = numpy.arange(0, array_.shape[1], scale_)
+    total = numpy.add.reduceat(numpy.add.reduceat(array_, rows, axis=0), columns, axis=1)
+    count = numpy.add.reduceat(numpy.add.reduceat(
+        numpy.ones(array_.shape, dtype=numpy.int32), rows, axis=0), columns, axis=1)
+    return total, count
+
+
+def build_mask2d_grayscale(surface_, scale_=1):
+    """
+    BUILD A MASK FROM A SURFACE (GRAYSCALE)
+
+    :param surface_: pygame.Surface compatible 24-32 bit
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
+    :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0]. Normalized array
+    """
+    assert isinstance(surface_, pygame.Surface), \
+        "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
+
+    width, height = surface_.get_size()
+    scale_ = _block_scale(width, height, scale_)
+    try:
+        rgb_array = pixels3d(surface_)
+    except ValueError as e:
+        raise ValueError("\nSurface cannot be referenced.\n%s " % e)
+
+    mask = empty(((width + scale_ - 1) // scale_, (height + scale_ - 1) // scale_), dtype=float32)
+    for start, stop in _chunks(width, height, scale_):
+        gray = rgb_array[start:stop].sum(axis=2, dtype=numpy.int32)
+        if scale_ == 1:
+            gray = (gray.astype(float64) / 3.0).astype(float32)
+            mask[start:stop] = gray.astype(float64) * ONE_255
+        else:
+            total, count = _block_sum(gray, scale_, 0, stop - start)
+            mask[start // scale_:(stop + scale_ - 1) // scale_] = total / (3.0 * count) * ONE_255
+    return mask
+
+
+def build_mask2d_bw(surface_, scale_=1):
+    """
+    BUILD A MASK FROM A SURFACE (BLACK AND WHITE)
+
+    :param surface_: pygame.Surface compatible 24-32 bit
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
+    :return        : Return a numpy.ndarray shape (w, h) with value 0.0 or 1.0
+    """
+    assert isinstance(surface_, pygame.Surface), \
+        "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
+
+    width, height = surface_.get_size()
+    scale_ = _block_scale(width, height, scale_)
+    try:
+        rgb_array = pixels3d(surface_)
+    except ValueError as e:
+        raise ValueError("\nSurface cannot be referenced.\n%s " % e)
+
+    mask = empty(((width + scale_ - 1) // scale_, (height + scale_ - 1) // scale_), dtype=float32)
+    for start, stop in _chunks(width, height, scale_):
+        gray = rgb_array[start:stop].sum(axis=2, dtype=numpy.int32)
+        if scale_ > 1:
+            gray = _block_sum(gray, scale_, 0, stop - start)[0]
+        mask[start // scale_:(stop + scale_ - 1) // scale_] = gray > 0
+    return mask
+
+
+def build_mask2d_alpha(surface_, scale_=1):
+    """
+    BUILD A MASK FROM A SURFACE (ALPHA)
+
+    :param surface_: pygame.Surface compatible 32 bit only with alpha channel
+    :param scale_  : integer; reduction factor (per axis) of the mask, default 1 (full resolution)
+    :return        : Return a numpy.ndarray shape (w, h) with value in range [0.0 ... 1.0] corresponding
+    to the channel alpha values / 255
+    """
+    assert isinstance(surface_, pygame.Surface), \
+        "\nArgument surface is invalid, expecting a pygame.Surface got %s " % type(surface_)
+    assert surface_.get_bytesize() == 4, \
+        "\nInvalid surface, the alpha channel is missing. \nImage byte size %s " % surface_.get_bytesize()
+    assert scale_ >= 1, "\nArgument scale_ must be >= 1 got %s " % scale_
+
+    width, height = surface_.get_size()
+    scale_ = _block_scale(width, height, scale_)
+    alpha = pixels_alpha(surface_)
+
+    mask = empty(((width + scale_ - 1) // scale_, (height + scale_ - 1) // scale_), dtype=float32)
+    for start, stop in _chunks(width, height, scale_):
+        if scale_ == 1:
+            mask[start:stop] = alpha[start:stop] * ONE_255
+        else:
+            total, count = _block_sum(alpha, scale_, start, stop)
+            mask[start // scale_:(stop + scale_ - 1) // scale_] = \
+                (total.astype(float32) / count.astype(float32)).astype(float64) * ONE_255
+    return mask
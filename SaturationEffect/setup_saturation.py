@@ -1,15 +1,26 @@
 """
 SETUP saturation.pyx
 """
+import sys
+
 from distutils.core import setup
 from distutils.extension import Extension
 from Cython.Distutils import build_ext
 from Cython.Build import cythonize
 import numpy
 
+# MSVC flags on Windows, GCC / Clang flags on the other platforms
+if sys.platform == "win32":
+    extra_compile_args = ["/openmp", "/Qpar", "/fp:fast", "/O2", "/Oy", "/Ot"]
+    extra_link_args = []
+else:
+    extra_compile_args = ["-fopenmp", "-O3"]
+    extra_link_args = ["-fopenmp"]
+
 ext_modules = cythonize(Extension(
     'saturation', ['saturation.pyx'],
-    extra_compile_args=["/openmp", "/Qpar", "/fp:fast", "/O2", "/Oy", "/Ot"],
+    extra_compile_args=extra_compile_args,
+    extra_link_args=extra_link_args,
     language="c",
     define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")]
     )
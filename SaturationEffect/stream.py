@@ -0,0 +1,331 @@
+"""
+MIT License
+
+Copyright (c) 2019 Yoann Berenguer
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+import numbers
+import queue
+import threading
+import time
+import weakref
+
+# NUMPY IS REQUIRED
+try:
+    import numpy
+    from numpy import uint8
+except ImportError:
+    raise ImportError("\n<numpy> library is missing on your system."
+                      "\nTry: \n   C:\\pip install numpy on a window command prompt.")
+
+# PYGAME IS REQUIRED
+try:
+    import pygame
+    from pygame.surfarray import pixels3d
+except ImportError:
+    raise ImportError("\n<Pygame> library is missing on your system."
+                      "\nTry: \n   C:\\pip install pygame on a window command prompt.")
+
+from . import saturation24_inplace
+
+
+def read_raw_frames(file_, width_, height_):
+    """
+    READ A STREAM OF RAW RGB FRAMES (E.G sys.stdin.buffer, ffmpeg -f rawvideo -pix_fmt rgb24)
+
+    The frames are read into the same buffer, a frame is valid until the next one is read
+    (saturate_stream copies each frame before reading the next one).
+
+    :param file_  : binary file object (readinto), rows of width_ RGB pixels without padding
+    :param width_ : integer; width of the frames
+    :param height_: integer; height of the frames
+    :return       : generator of numpy.ndarray (w, h, 3) uint8 views, stops at the end of
+    the stream (an incomplete last frame is ignored)
+    """
+    assert width_ > 0 and height_ > 0, \
+        "\nArguments width_ and height_ must be > 0 got (%s, %s) " % (width_, height_)
+
+    buffer_ = bytearray(width_ * height_ * 3)
+    view_ = memoryview(buffer_)
+    frame = numpy.frombuffer(buffer_, dtype=uint8).reshape(height_, width_, 3).transpose(1, 0, 2)
+
+    while True:
+        count = 0
+        while count < len(buffer_):
+            n = file_.readinto(view_[count:])
+            if not n:
+                return
+            count += n
+        yield frame
+
+
+def read_image_frames(paths_):
+    """
+    LOAD A SEQUENCE OF IMAGES (PNG, JPG, BMP etc)
+
+    :param paths_: iterable of image file names (e.g sorted(glob.glob('frames/*.png')))
+    :return      : generator of pygame.Surface
+    """
+    for path in paths_:
+        yield pygame.image.load(path)
+
+
+def saturate_stream(frames_, shift_, workers_=2, queue_size_=4, linear_=False):
+    """
+    CHANGE THE SATURATION LEVEL OF A SEQUENCE OF FRAMES (STREAMING PIPELINE)
+
+    The frames are decoded (iteration of frames_) by a producer thread into a pool of
+    reused buffers, the saturation (saturation24_inplace, the kernel runs without the GIL)
+    is applied by <workers_> threads and the frames are returned in order while the next
+    ones are being decoded and processed; the caller loop (encoding, display) overlaps
+    with both stages.
+
+    :param frames_    : iterable of frames; numpy.ndarray (w, h, 3) uint8 (or (w, h, 4), the
+    alpha channel is ignored) or pygame.Surface, all the frames must have the same size
+    :param shift_     : saturation schedule; float (same shift for all the frames), sequence of
+    float (one value per frame, the last value is kept for the next frames) or callable
+    returning the shift value of a frame number. Values in range [-1.0 ... 1.0]
+    :param workers_   : integer; number of saturation threads
+    :param queue_size_: integer; number of decoded frames waiting to be processed
+    :param linear_    : bool; True the saturation is changed in linear light
+    :return           : SaturationStream iterator of numpy.ndarray (w, h, 3) uint8
+    """
+    return SaturationStream(frames_, shift_, workers_, queue_size_, linear_)
+
+
+class SaturationStream(object):
+    """
+    ITERATOR RETURNED BY saturate_stream
+
+    Each frame returned is a numpy.ndarray (w, h, 3) uint8 referencing a buffer of the pool,
+    the buffer is reused once the next frame is requested (copy the frame to keep it).
+    frame.transpose(1, 0, 2) is C contiguous (rows of RGB pixels), e.g. to write raw
+    frames with file.write or build a surface with pygame.image.frombuffer.
+
+    The memory is bounded, workers_ + queue_size_ + 1 frame buffers are allocated.
+    The attributes frames, elapsed and fps report the number of frames returned, the time
+    since the start and the sustained frames per second of the whole pipeline.
+    An error raised while decoding or processing a frame is raised when that frame is
+    requested (the previous frames are returned) and for every request after it.
+    The threads are stopped at the end of the stream, on error, with close or when the
+    iterator is deleted.
+    """
+
+    def __init__(self, frames_, shift_, workers_=2, queue_size_=4, linear_=False):
+        """
+        :param frames_    : iterable of frames (see saturate_stream)
+        :param shift_     : float, sequence of float or callable (see saturate_stream)
+        :param workers_   : integer; number of saturation threads
+        :param queue_size_: integer; number of decoded frames waiting to be processed
+        :param linear_    : bool; True the saturation is changed in linear light
+        """
+        assert workers_ >= 1, "\nArgument workers_ must be >= 1 got %s " % workers_
+        assert queue_size_ >= 1, "\nArgument queue_size_ must be >= 1 got %s " % queue_size_
+
+        if callable(shift_):
+            schedule = shift_
+        elif isinstance(shift_, numbers.Real):
+            schedule = lambda index: float(shift_)
+        else:
+            shifts = [float(shift) for shift in shift_]
+            assert len(shifts) > 0, "\nArgument shift_ is an empty sequence"
+            schedule = lambda index: shifts[min(index, len(shifts) - 1)]
+
+        self.workers = workers_
+        self.frames = 0
+        # frame number -> buffer or exception
+        self._pending = {}
+        self._current = None
+        self._total = None
+        self._error = None
+        self._start = time.perf_counter()
+        self._end = None
+
+        # The threads only reference the pipeline, the stream can be collected
+        # (the finalizer stops the threads) when the caller stops iterating
+        self._pipeline = _Pipeline(iter(frames_), schedule, workers_, queue_size_, linear_)
+        self._finalizer = weakref.finalize(self, self._pipeline.close)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._error is not None:
+            raise self._error
+        if not self._finalizer.alive:
+            raise StopIteration
+
+        # The buffer of the previous frame returns to the pool
+        if self._current is not None:
+            self._pipeline.free.put(self._current)
+            self._current = None
+
+        while self.frames not in self._pending:
+            if self._total is not None and self.frames >= self._total:
+                if self._end is None:
+                    self._end = time.perf_counter()
+                self.close()
+                raise StopIteration
+            kind, index, item = self._pipeline.done.get()
+            if kind == 'end':
+                self._total = index
+            else:
+                self._pending[index] = item
+
+        item = self._pending.pop(self.frames)
+        if isinstance(item, Exception):
+            self._error = item
+            self._end = time.perf_counter()
+            self.close()
+            raise item
+
+        self._current = item
+        self.frames += 1
+        return self._current.transpose(1, 0, 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def elapsed(self):
+        """
+        :return: float; seconds since the start of the stream (until the last frame)
+        """
+        return (self._end or time.perf_counter()) - self._start
+
+    @property
+    def fps(self):
+        """
+        :return: float; sustained number of frames per second
+        """
+        elapsed = self.elapsed
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        """
+        STOP THE THREADS (CALLED AUTOMATICALLY AT THE END OF THE STREAM)
+
+        :return: void
+        """
+        self._finalizer()
+
+
+class _Pipeline(object):
+    """
+    THREADS AND QUEUES OF A SaturationStream
+
+    free : buffers returned by the consumer
+    tasks: decoded frames (index, buffer, shift) waiting for a worker, bounded
+    done : messages to the consumer ('frame', index, buffer), ('error', index, exception)
+    and ('end', number of frames, None)
+    """
+
+    def __init__(self, frames_, schedule_, workers_, queue_size_, linear_):
+        self.free = queue.Queue()
+        self.tasks = queue.Queue(queue_size_)
+        self.done = queue.Queue()
+        self._schedule = schedule_
+        self._linear = linear_
+        self._pool_size = workers_ + queue_size_ + 1
+        self._stop = threading.Event()
+
+        self._threads = [threading.Thread(target=self._produce, args=(frames_,), daemon=True)]
+        self._threads += [threading.Thread(target=self._work, daemon=True) for _ in range(workers_)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        self._stop.set()
+        # The producer (daemon) may be waiting for input, it stops at its next frame
+        for thread in self._threads[1:]:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def _get(self, queue_):
+        # Blocking get that gives up when the stream is closed
+        while not self._stop.is_set():
+            try:
+                return queue_.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        return None
+
+    def _put(self, queue_, item_):
+        # Blocking put that gives up when the stream is closed
+        while not self._stop.is_set():
+            try:
+                queue_.put(item_, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _buffer(self, shape_):
+        # Free buffer of the pool, a new one while the pool is not complete
+        if self._pool_size > 0:
+            self._pool_size -= 1
+            return numpy.empty((shape_[1], shape_[0], 3), dtype=uint8)
+        return self._get(self.free)
+
+    def _produce(self, frames_):
+        # Decode the frames into the buffers of the pool
+        index = 0
+        shape = None
+        try:
+            for frame in frames_:
+                if self._stop.is_set():
+                    return
+                if isinstance(frame, pygame.Surface):
+                    frame = pixels3d(frame)
+                if shape is None:
+                    shape = frame.shape[:2]
+                elif frame.shape[:2] != shape:
+                    raise ValueError("\nFrame %s size %s mismatch the stream size %s "
+                                     % (index, frame.shape[:2], shape))
+
+                buffer_ = self._buffer(shape)
+                if buffer_ is None:
+                    return
+                buffer_.transpose(1, 0, 2)[...] = frame[:, :, :3]
+                del frame
+
+                if not self._put(self.tasks, (index, buffer_, self._schedule(index))):
+                    return
+                index += 1
+            self.done.put(('end', index, None))
+        except Exception as e:
+            self.done.put(('error', index, e))
+
+    def _work(self):
+        # Apply the saturation to the decoded frames
+        while True:
+            task = self._get(self.tasks)
+            if task is None:
+                return
+            index, buffer_, shift = task
+            try:
+                saturation24_inplace(buffer_.transpose(1, 0, 2), shift, self._linear)
+                self.done.put(('frame', index, buffer_))
+            except Exception as e:
+                self.done.put(('error', index, e))
@@ -39,6 +39,9 @@ import numpy
 
 import SaturationEffect
 PROJECT_PATH = list(SaturationEffect.__path__)
+
+# Set the environment variable SATURATION_BACKEND=numpy to profile the pure NumPy backend
+print("\nBackend %s " % SaturationEffect.BACKEND)
 os.chdir(PROJECT_PATH[0] + "\\tests")
 
 result = {}
@@ -148,6 +151,40 @@ print("\nPerformance testing saturation_buffer_mask_inplace per call %s overall
       % (round(float(t)/float(N), 10), round(float(t), 5), N))
 result['saturation_buffer_mask_inplace'] = round(float(t)/float(N), 10)
 
+# 4K, exact method versus approximation (saturation gain computed per block 2x2 and 4x4)
+image = pygame.image.load('../Assets/p1.png').convert_alpha()
+image = pygame.transform.smoothscale(image, (3840, 2160))
+arr = pixels3d(image)
+alpha = pixels_alpha(image)
+
+for subsample in (1, 2, 4):
+    t = timeit.timeit("saturation24(arr, 0.5, %s)" % subsample,
+                      "from __main__ import saturation24, arr", number=N)
+    print("\nPerformance testing saturation24 3840x2160 subsample %s per call %s overall time %s for %s"
+          % (subsample, round(float(t)/float(N), 10), round(float(t), 5), N))
+    result['saturation24 3840x2160 subsample %s' % subsample] = round(float(t)/float(N), 10)
+
+    t = timeit.timeit("saturation32(arr, alpha, 0.5, %s)" % subsample,
+                      "from __main__ import saturation32, arr, alpha", number=N)
+    print("\nPerformance testing saturation32 3840x2160 subsample %s per call %s overall time %s for %s"
+          % (subsample, round(float(t)/float(N), 10), round(float(t), 5), N))
+    result['saturation32 3840x2160 subsample %s' % subsample] = round(float(t)/float(N), 10)
+
+del arr, alpha
+
+# Stream of 48 frames 1280x720, pipeline versus one frame at a time
+from SaturationEffect import saturate_stream
+frames = [array3d(pygame.transform.smoothscale(image, (1280, 720)))] * 8
+for workers in (1, 2, 4):
+    stream = saturate_stream((frames[i % 8] for i in range(48)), 0.5, workers_=workers)
+    for frame in stream:
+        pass
+    print("\nPerformance testing saturate_stream 1280x720 workers %s sustained fps %s for 48 frames"
+          % (workers, round(stream.fps, 2)))
+    result['saturate_stream 1280x720 workers %s' % workers] = round(stream.elapsed / 48.0, 10)
+
+del frames
+
 sorted_result = {k: v for k, v in sorted(result.items(), key=lambda item: item[1])}
 for k, v in sorted_result.items():
-    print("\n ",  k, v)
\ No newline at end of file
+    print("\n ",  k, v)
\ No newline at end of file
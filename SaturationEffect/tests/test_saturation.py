@@ -30,7 +30,7 @@ import os
 
 try:
     import pygame
-    from pygame.surfarray import array3d, pixels3d, pixels_alpha
+    from pygame.surfarray import array3d, pixels3d, pixels_alpha, array_alpha
 except ImportError:
     raise ImportError('\n<pygame> library is missing on your system.'
                       "\nTry: \n   C:\\pip install pygame on a window command prompt.")
@@ -38,7 +38,8 @@ except ImportError:
 from SaturationEffect import saturation24_mask, build_mask2d_grayscale, build_mask2d_bw, \
     build_mask2d_alpha, saturation32_mask, saturation24, saturation32, saturation24_inplace, \
     saturation32_inplace, saturation24_mask1, saturation32_mask1, saturation_buffer_mask, \
-    saturation_buffer_mask_inplace
+    saturation_buffer_mask_inplace, saturation_levels, SaturationCache, DiskCache, \
+    saturation_stats, auto_saturation, saturate_stream, read_raw_frames
 
 # numpy is require
 try:
@@ -194,6 +195,26 @@ class TestSaturation24Mask(unittest.TestCase):
                           numpy.full((800, 600, 3), (255.0, 255.0, 255.0), numpy.uint8), 0.2,
                           numpy.full((801, 600), 255, numpy.uint8))
 
+        # float64 masks give the same result as float32 masks (both backends)
+        image32 = image.convert_alpha()
+        mask = build_mask2d_grayscale(image)
+        mask64 = mask.astype(numpy.float64)
+        for method, args in ((saturation24_mask, (rgb_array,)), (saturation24_mask1, (image,)),
+                             (saturation32_mask, (image32,)),
+                             (saturation32_mask1, (array3d(image32), array_alpha(image32)))):
+            self.assertTrue(numpy.array_equal(
+                array3d(method(*args, 0.5, mask64)), array3d(method(*args, 0.5, mask))))
+        w, h = rgb_array.shape[:2]
+        buffer_ = rgb_array.transpose(1, 0, 2).tobytes()
+        mask1d = numpy.ascontiguousarray(mask.T).ravel()
+        self.assertTrue(numpy.array_equal(
+            array3d(saturation_buffer_mask(buffer_, 0.5, mask1d.astype(numpy.float64), w, h)),
+            array3d(saturation_buffer_mask(buffer_, 0.5, mask1d, w, h))))
+        array_ = bytearray(buffer_)
+        saturation_buffer_mask_inplace(array_, 0.5, mask1d.astype(numpy.float64), w, h)
+        self.assertEqual(bytes(array_), array3d(
+            saturation_buffer_mask(buffer_, 0.5, mask1d, w, h)).transpose(1, 0, 2).tobytes())
+
         display_refresh(screen, image, sat_surface)
 
 
@@ -516,6 +537,817 @@ class TestSaturationBufferMaskInplace(unittest.TestCase):
         display_refresh(screen, image, image)
 
 
+class TestSaturationBufferFormat(unittest.TestCase):
+    """
+    Test saturation_buffer_mask & saturation_buffer_mask_inplace with pixel format,
+    row pitch and without mask
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (640, 480))
+
+        pygame.display.set_caption("saturation_buffer_mask pixel format")
+
+        rgb = numpy.ascontiguousarray(pixels3d(image).transpose(1, 0, 2))
+        reference = saturation_buffer_mask(rgb.flatten(), 0.3, None, 640, 480)
+        self.assertEqual(reference.get_bitsize(), 24)
+
+        # BGRA buffer with 64 bytes of padding per row
+        pitch = 640 * 4 + 64
+        buffer_ = numpy.zeros((480, pitch), numpy.uint8)
+        bgra = buffer_[:, :640 * 4].reshape(480, 640, 4)
+        bgra[..., :3] = rgb[..., ::-1]
+        bgra[..., 3] = 128
+
+        sat_surface = saturation_buffer_mask(bytes(buffer_), 0.3, None, 640, 480, 'BGRA', pitch)
+        self.assertEqual(sat_surface.get_bitsize(), 32)
+        self.assertTrue(numpy.array_equal(array3d(sat_surface), array3d(reference)))
+        self.assertTrue((pixels_alpha(sat_surface) == 128).all())
+
+        # Inplace with a bytearray, the alpha channel and the padding are unchanged
+        data = bytearray(buffer_.tobytes())
+        saturation_buffer_mask_inplace(data, 0.3, None, 640, 480, 'BGRA', pitch)
+        data = numpy.frombuffer(data, numpy.uint8).reshape(480, pitch)
+        self.assertTrue(numpy.array_equal(
+            data[:, :640 * 4].reshape(480, 640, 4)[..., 2::-1].transpose(1, 0, 2), array3d(reference)))
+        self.assertTrue((data[:, :640 * 4].reshape(480, 640, 4)[..., 3] == 128).all())
+        self.assertTrue((data[:, 640 * 4:] == 0).all())
+
+        # Pixels outside the mask are left unchanged
+        mask = numpy.zeros(640 * 480, numpy.float32)
+        mask[:640 * 240] = 1.0
+        sat_surface = saturation_buffer_mask(rgb.flatten(), 0.3, mask, 640, 480)
+        self.assertTrue(numpy.array_equal(array3d(sat_surface)[:, 240:], rgb.transpose(1, 0, 2)[:, 240:]))
+        self.assertTrue(numpy.array_equal(array3d(sat_surface)[:, :240], array3d(reference)[:, :240]))
+
+        # Surface buffer referenced directly (zero copy)
+        format_ = 'BGRA' if image.get_shifts()[0] == 16 else 'RGBA'
+        saturation_buffer_mask_inplace(image.get_view('0'), 0.3, None, 640, 480, format_, image.get_pitch())
+
+        # Read-only buffer, invalid format, buffer too small, mask with the wrong length
+        self.assertRaises(ValueError, saturation_buffer_mask_inplace, bytes(buffer_), 0.3, None, 640, 480)
+        self.assertRaises(ValueError, saturation_buffer_mask, rgb.flatten(), 0.3, None, 640, 480, 'RGGB')
+        self.assertRaises(ValueError, saturation_buffer_mask, rgb.flatten(), 0.3, None, 640, 480, 'RGB', 100)
+        self.assertRaises(ValueError, saturation_buffer_mask, rgb.flatten()[:-1], 0.3, None, 640, 480)
+        self.assertRaises(ValueError, saturation_buffer_mask, rgb.flatten(), 0.3, mask[:-1], 640, 480)
+
+        display_refresh(screen, image, sat_surface)
+
+
+class TestSaturationSubsample(unittest.TestCase):
+    """
+    Test saturation24 & saturation32 approximation (argument subsample_)
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (640, 480))
+
+        pygame.display.set_caption("saturation24 subsample")
+
+        arr = pixels3d(image)
+        alpha = pixels_alpha(image)
+
+        self.assertRaises(AssertionError, saturation24, arr, 0.5, 0)
+        self.assertRaises(AssertionError, saturation32, arr, alpha, 0.5, 0)
+
+        for shift in (-0.5, 0.5):
+            exact24 = array3d(saturation24(arr, shift)).astype(numpy.int32)
+            exact32 = array3d(saturation32(arr, alpha, shift)).astype(numpy.int32)
+            self.assertTrue(numpy.array_equal(array3d(saturation24(arr, shift, 1)), exact24))
+
+            for subsample in (2, 4):
+                sat_surface = saturation24(arr, shift, subsample)
+                self.assertEqual(sat_surface.get_bitsize(), 24)
+                error = numpy.abs(array3d(sat_surface).astype(numpy.int32) - exact24)
+                # mean absolute error (per channel) and PSNR against the exact method
+                self.assertLess(error.mean(), 2.5)
+                self.assertGreater(10 * numpy.log10(255 ** 2 / (error ** 2).mean()), 35.0)
+
+                sat_surface = saturation32(arr, alpha, shift, subsample)
+                self.assertEqual(sat_surface.get_bitsize(), 32)
+                self.assertTrue(numpy.array_equal(pixels_alpha(sat_surface), alpha))
+                error = numpy.abs(array3d(sat_surface).astype(numpy.int32) - exact32)
+                self.assertLess(error.mean(), 2.5)
+                self.assertGreater(10 * numpy.log10(255 ** 2 / (error ** 2).mean()), 35.0)
+
+        # Any block size, partial blocks on the right and bottom edges (640x480 not multiple
+        # of 7), the result is exact for a uniform colour
+        uniform = numpy.full((640, 480, 3), (200, 120, 40), dtype=numpy.uint8)
+        for subsample in (3, 7):
+            sat_surface = saturation24(arr, 0.5, subsample)
+            error = numpy.abs(array3d(sat_surface).astype(numpy.int32) - exact24)
+            self.assertLess(error.mean(), 2.5)
+            self.assertLessEqual(numpy.abs(
+                array3d(saturation24(uniform, 0.3, subsample)).astype(numpy.int32) -
+                array3d(saturation24(uniform, 0.3))).max(), 1)
+
+        del arr, alpha
+        display_refresh(screen, image, sat_surface)
+
+
+class TestSaturationMaskScale(unittest.TestCase):
+    """
+    Test reduced resolution masks (build_mask2d_* scale_ argument)
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (640, 480))
+
+        pygame.display.set_caption("saturation mask scale")
+
+        mask_image = pygame.image.load("../Assets/logo_alpha.png").convert_alpha()
+        mask_image = pygame.transform.smoothscale(mask_image, (640, 480))
+
+        for build_mask in (build_mask2d_grayscale, build_mask2d_bw, build_mask2d_alpha):
+            mask = build_mask(mask_image, 4)
+            self.assertIsInstance(mask, numpy.ndarray)
+            self.assertEqual(mask.dtype, numpy.float32)
+            self.assertEqual(mask.shape, (160, 120))
+            # Size not divisible by the scale factor, the mask is rounded up
+            self.assertEqual(build_mask(mask_image, 7).shape, (92, 69))
+            self.assertRaises(AssertionError, build_mask, mask_image, 0)
+
+        # Mask 1/8 per axis, nearest-neighbor must match the full resolution mask
+        mask = build_mask2d_grayscale(mask_image, 8)
+        full_mask = numpy.repeat(numpy.repeat(mask, 8, axis=0), 8, axis=1)
+        rgb_array = array3d(image)
+        self.assertTrue(numpy.array_equal(
+            array3d(saturation24_mask(rgb_array, 0.5, mask)),
+            array3d(saturation24_mask(rgb_array, 0.5, full_mask))))
+
+        # Bilinear filtering
+        sat_surface = saturation24_mask(rgb_array, 0.5, mask, True)
+        self.assertEqual(sat_surface.get_size(), (640, 480))
+        sat_surface = saturation24_mask1(image, 0.5, mask, True)
+        self.assertEqual(sat_surface.get_size(), (640, 480))
+        sat_surface = saturation32_mask1(pixels3d(image), pixels_alpha(image), 0.5, mask, True)
+        self.assertEqual(sat_surface.get_size(), (640, 480))
+        sat_surface = saturation32_mask(image, 0.5, mask, True)
+        self.assertEqual(sat_surface.get_size(), (640, 480))
+
+        # Small sprites, size not a multiple of the scale factor (several factors can give
+        # the same mask size, e.g. 36 / 8 and 36 / 9 -> 5, 17 / 6 and 17 / 8 -> 3), the
+        # mask is built and sampled with the same blocks (the smallest factor)
+        for w, h, scale in ((36, 36, 8), (10, 10, 4), (20, 100, 8), (12, 40, 8), (37, 5, 2),
+                            (7, 9, 4), (17, 17, 8), (40, 40, 16), (1, 9, 4)):
+            sprite = pygame.transform.smoothscale(mask_image, (w, h))
+            sprite_array = array3d(sprite)
+            mask = build_mask2d_grayscale(sprite, scale)
+            block = min(k for k in range(1, scale + 1) if mask.shape == (-(-w // k), -(-h // k)))
+            for build_mask in (build_mask2d_grayscale, build_mask2d_bw, build_mask2d_alpha):
+                self.assertTrue(numpy.array_equal(build_mask(sprite, scale), build_mask(sprite, block)))
+            full_mask = numpy.repeat(numpy.repeat(mask, block, axis=0), block, axis=1)[:w, :h]
+            self.assertTrue(numpy.array_equal(
+                array3d(saturation24_mask(sprite_array, 0.5, mask)),
+                array3d(saturation24_mask(sprite_array, 0.5, numpy.ascontiguousarray(full_mask)))))
+            self.assertEqual(saturation24_mask1(sprite, 0.5, mask, True).get_size(), (w, h))
+            self.assertEqual(saturation32_mask(sprite, 0.5, mask, True).get_size(), (w, h))
+            self.assertEqual(saturation32_mask1(
+                pixels3d(sprite), pixels_alpha(sprite), 0.5, mask).get_size(), (w, h))
+            del sprite_array
+
+        for w in range(1, 40):
+            for h in (1, 7, 33):
+                sprite_array = numpy.zeros((w, h, 3), numpy.uint8)
+                for scale in (2, 4, 8):
+                    mask = numpy.ones(((w + scale - 1) // scale, (h + scale - 1) // scale), numpy.float32)
+                    saturation24_mask(sprite_array, 0.5, mask, True)
+
+        # Mask with a different reduction factor per axis
+        self.assertRaises(AssertionError, saturation24_mask, rgb_array, 0.5,
+                          numpy.full((160, 60), 1.0, numpy.float32))
+
+        display_refresh(screen, image, sat_surface)
+
+
+class TestSaturationCache(unittest.TestCase):
+    """
+    Test saturation_levels & SaturationCache
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (128, 96))
+
+        pygame.display.set_caption("SaturationCache")
+
+        arr = pixels3d(image)
+        alpha = pixels_alpha(image)
+
+        # Several levels in a single pass, same result than saturation24 / saturation32
+        shifts = numpy.linspace(-1.0, 1.0, 16, dtype=numpy.float32)
+        levels24 = saturation_levels(arr, None, shifts)
+        levels32 = saturation_levels(arr, alpha, shifts)
+        self.assertEqual(len(levels24), 16)
+        self.assertEqual(levels24[0].get_bitsize(), 24)
+        self.assertEqual(levels32[0].get_bitsize(), 32)
+        for k in (0, 5, 15):
+            self.assertLessEqual(numpy.abs(array3d(levels24[k]).astype(numpy.int32) -
+                                           array3d(saturation24(arr, float(shifts[k])))).max(), 1)
+            self.assertLessEqual(numpy.abs(array3d(levels32[k]).astype(numpy.int32) -
+                                           array3d(saturation32(arr, alpha, float(shifts[k])))).max(), 1)
+        self.assertTrue(numpy.array_equal(pixels_alpha(levels32[5]), alpha))
+        self.assertRaises(AssertionError, saturation_levels, arr, None, [0.5, 1.5])
+        del arr, alpha
+
+        # Lazy computation, the same surface is returned for the same level
+        frame_bytes = 128 * 96 * 4
+        cache = SaturationCache(levels_=64, max_bytes_=frame_bytes * 10)
+        sat_surface = cache.get(image, 0.5)
+        self.assertIs(cache.get(image, 0.5), sat_surface)
+        self.assertIs(cache.get(image, cache.shift(cache.level(0.5))), sat_surface)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.nbytes, frame_bytes)
+        self.assertRaises(AssertionError, cache.get, image, 1.5)
+
+        # Precompute, only 10 levels fit in the memory budget: 10 levels evenly spaced in
+        # the shift range are computed in a single pass, the memory used stays close to the budget
+        import tracemalloc
+        from SaturationEffect import cache as cache_module
+        computed = []
+
+        def counting_levels(array_, alpha_, shifts_, linear_=False):
+            computed.append(len(shifts_))
+            return saturation_levels(array_, alpha_, shifts_, linear_)
+
+        tracemalloc.start()
+        saturation_levels(pixels3d(image), pixels_alpha(image), [0.0] * 10)
+        batch_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        cache_module.saturation_levels = counting_levels
+        try:
+            cache.precompute(image)
+        finally:
+            cache_module.saturation_levels = saturation_levels
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(computed, [10])
+        self.assertEqual(len(cache), 10)
+        self.assertEqual(cache.nbytes, frame_bytes * 10)
+        self.assertEqual(sorted(level for _, level in cache._entries), [0, 7, 14, 21, 28, 35, 42, 49, 56, 63])
+        # one batch of 10 levels and the 10 levels kept in the cache
+        self.assertLess(peak, batch_peak + frame_bytes * 12)
+
+        # Levels already computed are kept, nothing to compute
+        cache.precompute(image)
+        self.assertEqual(computed, [10])
+        self.assertEqual(len(cache), 10)
+
+        # Budget larger than all the levels
+        cache = SaturationCache(levels_=8)
+        cache.precompute(image)
+        self.assertEqual(sorted(level for _, level in cache._entries), list(range(8)))
+
+        # Interpolation between two levels
+        cache = SaturationCache(levels_=8, interpolate_=True)
+        sat_surface = cache.get(image, 0.1)
+        self.assertEqual(sat_surface.get_size(), (128, 96))
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get(image, cache.shift(3)), cache.get(image, cache.shift(3)))
+
+        # The entries are discarded with the sprite
+        del image
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+        display_refresh(screen, sat_surface, sat_surface)
+
+
+class TestDiskCache(unittest.TestCase):
+    """
+    Test DiskCache
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        import tempfile
+        import shutil
+
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (128, 96))
+
+        pygame.display.set_caption("DiskCache")
+
+        path = tempfile.mkdtemp()
+        try:
+            cache = DiskCache(path, max_bytes_=4 * 128 * 96 * 4)
+            rgb_array = array3d(image)
+
+            sat_surface = cache.saturation24(rgb_array, 0.5)
+            self.assertEqual(len(os.listdir(path)), 1)
+            self.assertTrue(numpy.array_equal(array3d(sat_surface), array3d(saturation24(rgb_array, 0.5))))
+
+            # Second call, the result is mapped from the file
+            sat_surface = DiskCache(path).saturation24(rgb_array, 0.5)
+            self.assertEqual(sat_surface.get_bitsize(), 24)
+            self.assertTrue(numpy.array_equal(array3d(sat_surface), array3d(saturation24(rgb_array, 0.5))))
+            self.assertEqual(len(os.listdir(path)), 1)
+
+            # Linear light, a different entry
+            names = set(os.listdir(path))
+            sat_surface = cache.saturation24(rgb_array, 0.5, linear_=True)
+            self.assertTrue(numpy.array_equal(
+                array3d(sat_surface), array3d(saturation24(rgb_array, 0.5, linear_=True))))
+            self.assertEqual(len(os.listdir(path)), 2)
+            sat_surface = DiskCache(path).saturation32_mask(image, 0.2, None, linear_=True)
+            self.assertTrue(numpy.array_equal(
+                array3d(sat_surface), array3d(saturation32_mask(image, 0.2, None, linear_=True))))
+            for name in set(os.listdir(path)) - names:
+                os.remove(os.path.join(path, name))
+
+            # Different pixels, shift or mask give different entries
+            cache.saturation24(rgb_array, 0.4)
+            rgb_array[0, 0] ^= 1
+            cache.saturation24(rgb_array, 0.4)
+            self.assertEqual(len(os.listdir(path)), 3)
+
+            mask = build_mask2d_alpha(image)
+            sat_surface = cache.saturation32_mask(image, 0.2, mask)
+            sat_surface = cache.saturation32_mask(image, 0.2, mask)
+            self.assertEqual(sat_surface.get_bitsize(), 32)
+            self.assertTrue(numpy.array_equal(pixels_alpha(sat_surface), pixels_alpha(image)))
+            self.assertTrue(numpy.array_equal(
+                array3d(sat_surface), array3d(saturation32_mask(image, 0.2, mask))))
+
+            # Temporary files abandoned by an interrupted process are deleted, not the
+            # recent ones (written by another process)
+            from SaturationEffect.cache import TEMPORARY_TIMEOUT
+            for name in ('stale.tmp', 'recent.tmp'):
+                with open(os.path.join(path, name), 'wb') as file_:
+                    file_.write(b'\0' * 1024)
+            stale = time.time() - TEMPORARY_TIMEOUT - 60
+            os.utime(os.path.join(path, 'stale.tmp'), (stale, stale))
+            cache.saturation24(rgb_array, 0.1)
+            self.assertFalse(os.path.exists(os.path.join(path, 'stale.tmp')))
+            self.assertTrue(os.path.exists(os.path.join(path, 'recent.tmp')))
+            os.remove(os.path.join(path, 'recent.tmp'))
+
+            # Size bounded, the least recently used files are deleted
+            for shift in (-0.1, -0.2, -0.3):
+                cache.saturation24(rgb_array, shift)
+            self.assertLessEqual(cache.nbytes, 4 * 128 * 96 * 4)
+            self.assertTrue(all(name.endswith('.npy') for name in os.listdir(path)))
+
+            cache.clear()
+            self.assertEqual(os.listdir(path), [])
+            del rgb_array
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+        display_refresh(screen, image, sat_surface)
+
+
+class TestSaturationStats(unittest.TestCase):
+    """
+    Test saturation_stats and auto_saturation
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (640, 480))
+
+        pygame.display.set_caption("saturation_stats")
+
+        rgb_array = array3d(image)
+        alpha_array = array_alpha(image)
+
+        # Reference HSL saturation computed with numpy
+        rgb = rgb_array.astype(numpy.float64) / 255.0
+        cmax, cmin = rgb.max(axis=2), rgb.min(axis=2)
+        delta, lightness = cmax - cmin, (cmax + cmin) / 2.0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            saturation = numpy.where(delta == 0, 0.0, numpy.where(
+                lightness <= 0.5, delta / (cmax + cmin), delta / (2.0 - cmax - cmin)))
+
+        stats = saturation_stats(rgb_array, bins_=100, percentiles_=(10.0, 50.0, 90.0))
+        self.assertEqual(stats['count'], 640 * 480)
+        self.assertEqual(stats['histogram'].shape, (100,))
+        self.assertEqual(stats['histogram'].sum(), 640 * 480)
+        self.assertAlmostEqual(stats['mean'], saturation.mean(), places=5)
+        reference = numpy.histogram(saturation, bins=100, range=(0.0, 1.0))[0]
+        # Values on the bin edges may fall in the next bin (float32 / float64 rounding)
+        self.assertLessEqual(numpy.abs(reference - stats['histogram']).sum(), 0.05 * 640 * 480)
+        self.assertTrue(numpy.allclose(
+            stats['percentiles'], numpy.percentile(saturation, (10.0, 50.0, 90.0)), atol=0.02))
+
+        # Transparent pixels are ignored
+        stats = saturation_stats(rgb_array, alpha_array)
+        self.assertEqual(stats['count'], (alpha_array > 0).sum())
+        self.assertAlmostEqual(stats['mean'], saturation[alpha_array > 0].mean(), places=5)
+
+        # Empty selection
+        stats = saturation_stats(rgb_array, numpy.zeros((640, 480), dtype=numpy.uint8))
+        self.assertEqual(stats['count'], 0)
+        self.assertEqual(stats['mean'], 0.0)
+
+        self.assertRaises(AssertionError, saturation_stats, rgb_array, None, 0)
+        self.assertRaises(AssertionError, saturation_stats, rgb_array, None, 256, (101.0,))
+
+        for target in (0.05, 0.25, 0.45):
+            sat_surface = auto_saturation(rgb_array, target)
+            self.assertEqual(sat_surface.get_bitsize(), 24)
+            self.assertAlmostEqual(saturation_stats(array3d(sat_surface))['mean'], target, delta=0.01)
+
+        sat_surface = auto_saturation(rgb_array, 0.8, alpha_array)
+        self.assertEqual(sat_surface.get_bitsize(), 32)
+        self.assertAlmostEqual(saturation_stats(
+            array3d(sat_surface), alpha_array)['mean'], 0.8, delta=0.01)
+        self.assertRaises(AssertionError, auto_saturation, rgb_array, 1.5)
+
+        display_refresh(screen, image, sat_surface)
+
+
+class TestSaturationLinear(unittest.TestCase):
+    """
+    Test the linear light mode (argument linear_)
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (640, 480))
+
+        pygame.display.set_caption("saturation linear_")
+
+        rgb_array = array3d(image)
+        alpha_array = array_alpha(image)
+
+        def decode(array):
+            v = array.astype(numpy.float64) / 255.0
+            return numpy.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+        def encode(array):
+            v = numpy.where(array <= 0.0031308, array * 12.92, 1.055 * array ** (1.0 / 2.4) - 0.055)
+            return numpy.round(v * 255.0).astype(numpy.int32)
+
+        # The sRGB tables are exact inverse, no change without shift
+        sat_surface = saturation32(rgb_array, alpha_array, 0.0, linear_=True)
+        self.assertTrue(numpy.array_equal(array3d(sat_surface), rgb_array))
+        self.assertTrue(numpy.array_equal(pixels_alpha(sat_surface), alpha_array))
+
+        self.assertTrue(numpy.array_equal(
+            array3d(saturation24(rgb_array, 0.4, linear_=False)), array3d(saturation24(rgb_array, 0.4))))
+
+        # Full desaturation, grey level is the HSL lightness computed in linear light
+        linear = decode(rgb_array)
+        grey = encode((linear.max(axis=2) + linear.min(axis=2)) / 2.0)
+        sat_surface = saturation32(rgb_array, alpha_array, -1.0, linear_=True)
+        self.assertLessEqual(numpy.abs(array3d(sat_surface) - grey[..., None]).max(), 1)
+
+        mask = build_mask2d_alpha(image)
+        sat_surface = saturation24_mask(rgb_array, 0.0, None, linear_=True)
+        self.assertTrue(numpy.array_equal(array3d(sat_surface), rgb_array))
+        sat_surface = saturation32_mask(image, 0.5, mask, linear_=True)
+        self.assertEqual(sat_surface.get_bitsize(), 32)
+
+        self.assertRaises(AssertionError, saturation24, rgb_array, 0.5, 2, True)
+
+        # Inplace methods
+        expected = array3d(saturation24(rgb_array, 0.3, linear_=True))
+        array_ = rgb_array.copy()
+        saturation24_inplace(array_, 0.3, True)
+        self.assertTrue(numpy.array_equal(array_, expected))
+        array_ = numpy.dstack((rgb_array, alpha_array))
+        saturation32_inplace(array_, 0.3, True)
+        self.assertTrue(numpy.array_equal(array_[:, :, :3], expected))
+        self.assertTrue(numpy.array_equal(array_[:, :, 3], alpha_array))
+
+        # Saturation levels, same result as saturation24 / saturation32 (float32 shift values)
+        surfaces = saturation_levels(rgb_array, None, [-1.0, 0.25], True)
+        for shift, sat_surface in zip((-1.0, 0.25), surfaces):
+            expected = array3d(saturation24(rgb_array, shift, linear_=True)).astype(numpy.int32)
+            self.assertLessEqual(numpy.abs(array3d(sat_surface) - expected).max(), 1)
+        surfaces = saturation_levels(rgb_array, alpha_array, [-1.0, 0.25], True)
+        for shift, sat_surface in zip((-1.0, 0.25), surfaces):
+            expected = array3d(saturation32(rgb_array, alpha_array, shift, linear_=True)).astype(numpy.int32)
+            self.assertLessEqual(numpy.abs(array3d(sat_surface) - expected).max(), 1)
+
+        # Buffer methods (rows of pixels)
+        w, h = rgb_array.shape[:2]
+        buffer_ = bytearray(rgb_array.transpose(1, 0, 2).tobytes())
+        sat_surface = saturation_buffer_mask(bytes(buffer_), 0.0, None, w, h, 'RGB', 0, True)
+        self.assertTrue(numpy.array_equal(array3d(sat_surface), rgb_array))
+        expected = array3d(saturation32(rgb_array, alpha_array, -1.0, linear_=True)).astype(numpy.int32)
+        sat_surface = saturation_buffer_mask(bytes(buffer_), -1.0, None, w, h, linear_=True)
+        self.assertLessEqual(numpy.abs(array3d(sat_surface) - expected).max(), 1)
+        saturation_buffer_mask_inplace(buffer_, -1.0, None, w, h, linear_=True)
+        self.assertTrue(numpy.array_equal(
+            numpy.frombuffer(buffer_, numpy.uint8).reshape(h, w, 3).transpose(1, 0, 2), array3d(sat_surface)))
+
+        # Cache and stream use the linear light kernels
+        sprite = pygame.surfarray.make_surface(rgb_array)
+        cache = SaturationCache(levels_=5, linear_=True)
+        expected = array3d(saturation24(rgb_array, 0.5, linear_=True)).astype(numpy.int32)
+        self.assertLessEqual(numpy.abs(array3d(cache.get(sprite, 0.5)) - expected).max(), 1)
+        for frame in saturate_stream([rgb_array] * 2, 0.3, linear_=True):
+            self.assertTrue(numpy.array_equal(frame, array3d(saturation24(rgb_array, 0.3, linear_=True))))
+
+        display_refresh(screen, image, saturation24(rgb_array, 0.5, linear_=True))
+
+
+class TestNumpyBackend(unittest.TestCase):
+    """
+    Test the pure NumPy backend (saturation_numpy) against the compiled module
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        try:
+            from SaturationEffect import saturation as compiled
+        except ImportError:
+            self.skipTest("Compiled module is not available")
+        from SaturationEffect import saturation_numpy
+
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (333, 257))
+        rgb_array = array3d(image)
+        alpha_array = array_alpha(image)
+
+        pygame.display.set_caption("NumPy backend")
+
+        # Small chunks, several chunks per image
+        chunk_size = saturation_numpy.CHUNK_SIZE
+        saturation_numpy.CHUNK_SIZE = 5000
+        try:
+            for name in ('build_mask2d_grayscale', 'build_mask2d_bw', 'build_mask2d_alpha'):
+                for scale in (1, 4):
+                    self.assertTrue(numpy.array_equal(
+                        getattr(compiled, name)(image, scale), getattr(saturation_numpy, name)(image, scale)))
+
+            mask = build_mask2d_alpha(image, 4)
+            calls = [
+                ('saturation24', (rgb_array, 0.3)),
+                ('saturation24', (rgb_array, -0.6, 1, True)),
+                ('saturation24', (rgb_array, 0.3, 3)),
+                ('saturation32', (rgb_array, alpha_array, 0.5)),
+                ('saturation32', (rgb_array, alpha_array, 0.5, 2)),
+                ('saturation24_mask', (rgb_array, 0.4, mask, True)),
+                ('saturation24_mask1', (image, 0.4, None)),
+                ('saturation32_mask', (image, -0.4, mask, False, True)),
+                ('saturation32_mask1', (rgb_array, alpha_array, 0.4, mask)),
+                ('auto_saturation', (rgb_array, 0.3)),
+                ('saturation_buffer_mask', (image.get_view('0'), 0.2, None, 333, 257, 'BGRA', image.get_pitch()))
+            ]
+            for name, args in calls:
+                compiled_surface = getattr(compiled, name)(*args)
+                numpy_surface = getattr(saturation_numpy, name)(*args)
+                self.assertEqual(compiled_surface.get_bitsize(), numpy_surface.get_bitsize(), name)
+                self.assertLessEqual(
+                    numpy.abs(array3d(compiled_surface).astype(numpy.int16) - array3d(numpy_surface)).max(), 1, name)
+
+            for compiled_surface, numpy_surface in zip(
+                    compiled.saturation_levels(rgb_array, alpha_array, (-0.5, 0.5)),
+                    saturation_numpy.saturation_levels(rgb_array, alpha_array, (-0.5, 0.5))):
+                self.assertLessEqual(
+                    numpy.abs(array3d(compiled_surface).astype(numpy.int16) - array3d(numpy_surface)).max(), 1)
+
+            stats = saturation_numpy.saturation_stats(rgb_array, alpha_array)
+            self.assertEqual(stats['count'], compiled.saturation_stats(rgb_array, alpha_array)['count'])
+            self.assertAlmostEqual(stats['mean'], compiled.saturation_stats(rgb_array, alpha_array)['mean'])
+
+            compiled_array, numpy_array = rgb_array.copy(), rgb_array.copy()
+            compiled.saturation24_inplace(compiled_array, 0.2)
+            saturation_numpy.saturation24_inplace(numpy_array, 0.2)
+            self.assertLessEqual(numpy.abs(compiled_array.astype(numpy.int16) - numpy_array).max(), 1)
+
+            compiled_buffer, numpy_buffer = bytearray(image.get_view('0')), bytearray(image.get_view('0'))
+            mask = numpy.ones(333 * 257, dtype=numpy.float32)
+            mask[::2] = 0.0
+            compiled.saturation_buffer_mask_inplace(compiled_buffer, 0.5, mask, 333, 257, 'BGRA', image.get_pitch())
+            saturation_numpy.saturation_buffer_mask_inplace(numpy_buffer, 0.5, mask, 333, 257, 'BGRA', image.get_pitch())
+            self.assertLessEqual(numpy.abs(
+                numpy.frombuffer(compiled_buffer, numpy.uint8).astype(numpy.int16) -
+                numpy.frombuffer(numpy_buffer, numpy.uint8)).max(), 1)
+        finally:
+            saturation_numpy.CHUNK_SIZE = chunk_size
+
+        display_refresh(screen, image, saturation_numpy.saturation24(rgb_array, 0.5))
+
+
+class TestSaturateStream(unittest.TestCase):
+    """
+    Test saturate_stream
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        import io
+
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 480))
+
+        image = pygame.image.load('../Assets/p1.png').convert()
+        image = pygame.transform.smoothscale(image, (160, 120))
+
+        pygame.display.set_caption("saturate_stream")
+
+        # Each frame is different, the order of the results is checked
+        frames = []
+        for i in range(24):
+            rgb_array = array3d(image)
+            rgb_array[0, 0] = (i, i, i)
+            frames.append(rgb_array)
+        shifts = [-0.5 + i / 24.0 for i in range(24)]
+
+        for workers in (1, 3):
+            stream = saturate_stream(iter(frames), shifts, workers_=workers, queue_size_=2)
+            count = 0
+            for frame, rgb_array, shift in zip(stream, frames, shifts):
+                self.assertEqual(frame.shape, (160, 120, 3))
+                expected = rgb_array.copy()
+                saturation24_inplace(expected, shift)
+                self.assertTrue(numpy.array_equal(frame, expected))
+                count += 1
+            self.assertEqual(count, 24)
+            self.assertRaises(StopIteration, next, stream)
+            self.assertEqual(stream.frames, 24)
+            self.assertGreater(stream.fps, 0)
+
+        # Constant shift, callable schedule and surfaces give the same result as saturation24
+        expected = array3d(saturation24(array3d(image), 0.3))
+        for shift in (0.3, lambda index: 0.3, [0.3]):
+            for frame in saturate_stream([image] * 4, shift):
+                self.assertTrue(numpy.array_equal(frame, expected))
+
+        # Raw RGB stream (rows of pixels)
+        raw = io.BytesIO(b''.join(rgb_array.transpose(1, 0, 2).tobytes() for rgb_array in frames[:5]))
+        with saturate_stream(read_raw_frames(raw, 160, 120), 0.0) as stream:
+            result = [frame.copy() for frame in stream]
+        self.assertEqual(len(result), 5)
+        for frame, rgb_array in zip(result, frames):
+            expected = rgb_array.copy()
+            saturation24_inplace(expected, 0.0)
+            self.assertTrue(numpy.array_equal(frame, expected))
+
+        # Errors raised in the threads are raised by the iterator when the frame is
+        # requested (the previous frames are returned) and for the next requests
+        for workers in (1, 3):
+            stream = saturate_stream(
+                frames[:5] + [numpy.zeros((10, 10, 3), numpy.uint8)], 0.1, workers_=workers)
+            for n in range(5):
+                self.assertEqual(next(stream).shape, (160, 120, 3))
+            self.assertRaises(ValueError, next, stream)
+            self.assertRaises(ValueError, next, stream)
+            self.assertEqual(stream.frames, 5)
+        stream = saturate_stream(frames[:3], [0.1, 0.1, 2.0])
+        self.assertEqual(len([next(stream), next(stream)]), 2)
+        self.assertRaises(AssertionError, next, stream)
+        self.assertRaises(AssertionError, list, stream)
+
+        # Stopped before the end
+        import gc
+        import threading
+        threads = threading.active_count()
+        stream = saturate_stream(frames, 0.2, queue_size_=1)
+        next(stream)
+        stream.close()
+        self.assertRaises(StopIteration, next, stream)
+
+        # Iteration abandoned without close, the threads stop when the stream is deleted
+        for frame in saturate_stream(iter(frames), 0.2, workers_=3, queue_size_=1):
+            break
+        del frame
+        gc.collect()
+        timeout = time.time() + 2.0
+        while threading.active_count() > threads and time.time() < timeout:
+            time.sleep(0.01)
+        self.assertEqual(threading.active_count(), threads)
+
+        sat_surface = pygame.surfarray.make_surface(result[-1])
+        display_refresh(screen, image, sat_surface)
+
+
+@unittest.skipUnless(SaturationEffect.BACKEND == 'cython', "Compiled module is not available")
+class TestCApi(unittest.TestCase):
+    """
+    Test the nogil C API exported by the module (saturate_rgb_row, saturate_rgb_tile,
+    saturate_rgba_tile)
+    """
+
+    def runTest(self) -> None:
+        """
+        :return:  void
+        """
+        from SaturationEffect import saturation
+        import ctypes
+        capi = saturation.__pyx_capi__
+        for name in ('saturate_rgb_row', 'saturate_rgb_tile', 'saturate_rgba_tile'):
+            self.assertIn(name, capi)
+            self.assertEqual(type(capi[name]).__name__, 'PyCapsule')
+
+        # Call the functions through their pointers (capsule name is the C signature)
+        ctypes.pythonapi.PyCapsule_GetName.restype = ctypes.c_char_p
+        ctypes.pythonapi.PyCapsule_GetName.argtypes = [ctypes.py_object]
+        ctypes.pythonapi.PyCapsule_GetPointer.restype = ctypes.c_void_p
+        ctypes.pythonapi.PyCapsule_GetPointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+
+        def c_function(name, *argtypes):
+            capsule = capi[name]
+            pointer = ctypes.pythonapi.PyCapsule_GetPointer(
+                capsule, ctypes.pythonapi.PyCapsule_GetName(capsule))
+            return ctypes.CFUNCTYPE(None, ctypes.c_void_p, *argtypes)(pointer)
+
+        saturate_rgb_row = c_function(
+            'saturate_rgb_row', ctypes.c_int, ctypes.c_int, ctypes.c_float)
+        saturate_rgb_tile = c_function(
+            'saturate_rgb_tile', ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ssize_t, ctypes.c_float)
+        saturate_rgba_tile = c_function(
+            'saturate_rgba_tile', ctypes.c_int, ctypes.c_int, ctypes.c_ssize_t, ctypes.c_float)
+
+        pygame.init()
+        pygame.display.set_mode((1280, 480))
+        image = pygame.image.load('../Assets/p1.png').convert_alpha()
+        image = pygame.transform.smoothscale(image, (64, 48))
+        w, h = image.get_size()
+        rgb_array = array3d(image)
+        alpha = numpy.random.randint(0, 256, (w, h), dtype=numpy.uint8)
+
+        # RGBA rows padded with 16 bytes (row_stride > width * 4)
+        row_stride = w * 4 + 16
+        buffer_ = numpy.full((h, row_stride), 0xab, dtype=numpy.uint8)
+        pixels = buffer_[:, :w * 4].reshape(h, w, 4)
+        pixels[:, :, :3] = rgb_array.transpose(1, 0, 2)
+        pixels[:, :, 3] = alpha.T
+        saturate_rgba_tile(buffer_.ctypes.data, w, h, row_stride, 0.3)
+
+        expected = array3d(saturation32(rgb_array, alpha, 0.3)).transpose(1, 0, 2)
+        self.assertLessEqual(numpy.abs(pixels[:, :, :3].astype(numpy.int16) - expected).max(), 1)
+        self.assertTrue(numpy.array_equal(pixels[:, :, 3], alpha.T))
+        self.assertTrue((buffer_[:, w * 4:] == 0xab).all())
+
+        # RGB tile (16 x 8) inside a padded buffer, the bytes outside the tile are unchanged
+        row_stride = w * 3 + 5
+        buffer_ = numpy.full((h, row_stride), 0xab, dtype=numpy.uint8)
+        buffer_[:, :w * 3] = rgb_array.transpose(1, 0, 2).reshape(h, w * 3)
+        source = buffer_.copy()
+        x0, y0, tw, th = 8, 4, 16, 8
+        saturate_rgb_tile(buffer_.ctypes.data + y0 * row_stride + x0 * 3, tw, th, 3, row_stride, -0.4)
+
+        tile = buffer_[y0:y0 + th, x0 * 3:(x0 + tw) * 3].reshape(th, tw, 3)
+        expected = array3d(saturation32(
+            numpy.ascontiguousarray(rgb_array[x0:x0 + tw, y0:y0 + th]),
+            numpy.full((tw, th), 255, numpy.uint8), -0.4)).transpose(1, 0, 2)
+        self.assertLessEqual(numpy.abs(tile.astype(numpy.int16) - expected).max(), 1)
+        outside = numpy.ones(buffer_.shape, dtype=bool)
+        outside[y0:y0 + th, x0 * 3:(x0 + tw) * 3] = False
+        self.assertTrue(numpy.array_equal(buffer_[outside], source[outside]))
+
+        # A single row, 4 bytes per pixel
+        buffer_ = numpy.ascontiguousarray(pixels[0].copy())
+        saturate_rgb_row(buffer_.ctypes.data, w, 4, 0.0)
+        self.assertLessEqual(numpy.abs(buffer_.astype(numpy.int16) - pixels[0]).max(), 1)
+
+
 def run_testsuite():
     """
     test suite
@@ -535,10 +1367,20 @@ def run_testsuite():
         TestSaturation32Mask1(),
         TestSaturation24(),
         TestSaturation32(),
+        TestSaturationSubsample(),
         TestSaturation24Inplace(),
         TestSaturation32Inplace(),
         TestSaturationBufferMask(),
-        TestSaturationBufferMaskInplace()
+        TestSaturationBufferMaskInplace(),
+        TestSaturationBufferFormat(),
+        TestSaturationMaskScale(),
+        TestSaturationCache(),
+        TestDiskCache(),
+        TestSaturationStats(),
+        TestSaturationLinear(),
+        TestNumpyBackend(),
+        TestSaturateStream(),
+        TestCApi()
     ])
 
     unittest.TextTestRunner().run(suite)
@@ -3,6 +3,8 @@ Setup.py file
 
 Configure the project, build the package and upload the package to PYPI
 """
+import sys
+
 import setuptools
 from Cython.Build import cythonize
 from setuptools import Extension
@@ -14,6 +16,14 @@ except ImportError:
     raise ImportError("\n<numpy> library is missing on your system."
                       "\nTry: \n   C:\\pip install numpy on a window command prompt.")
 
+# MSVC flags on Windows, GCC / Clang flags on the other platforms
+if sys.platform == "win32":
+    extra_compile_args = ["/openmp", "/Qpar", "/fp:fast", "/O2", "/Oy", "/Ot"]
+    extra_link_args = []
+else:
+    extra_compile_args = ["-fopenmp", "-O3"]
+    extra_link_args = ["-fopenmp"]
+
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
 
@@ -30,7 +40,8 @@ setuptools.setup(
     packages=['SaturationEffect'],
     ext_modules=cythonize([
         Extension("SaturationEffect.saturation", ["SaturationEffect/saturation.pyx"],
-                  extra_compile_args=["/openmp", "/Qpar", "/fp:fast", "/O2", "/Oy", "/Ot"], language="c")]),
+                  extra_compile_args=extra_compile_args, extra_link_args=extra_link_args,
+                  language="c")]),
     include_dirs=[numpy.get_include()],
     define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")],
     license='MIT',
@@ -81,6 +92,9 @@ setuptools.setup(
           'README.md',
           'requirements.txt',
           'SaturationEffect/__init__.py',
+          'SaturationEffect/cache.py',
+          'SaturationEffect/saturation_numpy.py',
+          'SaturationEffect/stream.py',
           'SaturationEffect/__init__.pxd',
           'SaturationEffect/saturation.pyx',
           'SaturationEffect/saturation.pxd',